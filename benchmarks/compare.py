@@ -0,0 +1,67 @@
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 10.0  # % of change reported as a regression or an improvement
+
+
+def higher_is_better(metric: str) -> bool:
+    # Throughputs end with "_per_s", latencies ("_ms") and memory ("_bytes") are better when lower
+    return metric.endswith("_per_s")
+
+
+def compare(base: dict, new: dict, threshold: float):
+    # Yields (benchmark, metric, base value, new value, change in %, verdict)
+    for benchmark, metrics in new["results"].items():
+        base_metrics = base["results"].get(benchmark, {})
+        for metric, value in metrics.items():
+            base_value = base_metrics.get(metric)
+            if base_value is None:
+                yield benchmark, metric, None, value, None, "new"
+                continue
+            change = (value - base_value) / abs(base_value) * 100 if base_value else 0.0
+            better = change > 0 if higher_is_better(metric) else change < 0
+            if abs(change) < threshold:
+                verdict = ""
+            else:
+                verdict = "improved" if better else "REGRESSED"
+            yield benchmark, metric, base_value, value, change, verdict
+
+
+def _format(value) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two result files of benchmarks.run")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Change in %% below which a difference is ignored")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as file:
+        base = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    for key in ("backend", "quick"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"Warning: the runs differ in {key} ({base['meta'].get(key)} vs {new['meta'].get(key)})")
+
+    rows = [("benchmark", "metric", base["meta"].get("commit") or "base", new["meta"].get("commit") or "new",
+             "change", "")]
+    regressions = 0
+    for benchmark, metric, base_value, value, change, verdict in compare(base, new, args.threshold):
+        regressions += verdict == "REGRESSED"
+        rows.append((benchmark, metric, _format(base_value), _format(value),
+                     "-" if change is None else f"{change:+.1f}%", verdict))
+
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    print(f"{regressions} regression(s) above {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
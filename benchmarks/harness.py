@@ -0,0 +1,187 @@
+import math
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from src.exemples import ble_json_service_tab, ble_uart_service_tab
+from src.line_framer import LineFramer
+from src.ring_buffer import RingBuffer
+
+# Backends the hot paths can be driven with:
+# - "agg": no display needed, the figures are rendered with the Agg canvas and the Tk widgets are replaced by
+#   stand-ins, so the numbers cover the Python and matplotlib work but not the Tk blitting
+# - "tk": the real widgets in a hidden window, needs a display (e.g. `xvfb-run python -m benchmarks.run --backend tk`)
+BACKENDS = ("agg", "tk")
+
+
+class Harness(NamedTuple):
+    target: object
+    pump: Callable[[], None]  # Processes the pending Tk events and drawing, a no-op with Agg
+    close: Callable[[], None]
+
+
+class _Widget:
+    # Stand-in for the Tk widgets the benchmarked code configures
+    def __init__(self, value=None):
+        self._value = value
+
+    def configure(self, **kwargs):
+        pass
+
+    def get(self):
+        return self._value
+
+    def set(self, *args):
+        pass
+
+
+class _AggCanvas(FigureCanvasAgg):
+    def blit(self, bbox=None):  # Nothing to copy the pixels to
+        pass
+
+
+def _tk_root():
+    import customtkinter as ctk
+
+    root = ctk.CTk()
+    root.geometry("1600x1000")
+    root.update()
+    return root
+
+
+def _tk_harness(root, widget) -> Harness:
+    widget.grid(row=0, column=0, sticky="nsew")
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_rowconfigure(0, weight=1)
+    root.update()
+    return Harness(widget, root.update, root.destroy)
+
+
+def json_tab(backend: str, figsize=(16, 12)) -> Harness:
+    cls = ble_json_service_tab.ExJSONServiceTab
+    if backend == "tk":
+        root = _tk_root()
+        return _tk_harness(root, cls(root))
+
+    # Same steps as ExJSONServiceTab.__init__, on an Agg canvas
+    tab = cls.__new__(cls)
+    tab._fig = Figure(dpi=100, figsize=figsize)
+    tab._fig.set_tight_layout(True)
+    tab._initialize_data_storage()
+    tab._setup_subplots()
+    tab._setup_axes()
+    tab._setup_artists()
+    tab._canvas = _AggCanvas(tab._fig)
+    tab._backgrounds = {}
+    tab._canvas.mpl_connect('draw_event', tab._on_draw)
+    tab._canvas.draw()
+    tab._update_plot()
+    return Harness(tab, lambda: None, lambda: None)
+
+
+class _UARTStream:
+    # Framer and plotter of the UARTServiceTab without the terminal, which needs a Tk text widget
+    def __init__(self, plotter):
+        self._framer = LineFramer()
+        self._plotter = plotter
+
+    def update_data_batch(self, samples):
+        self._plotter.update_values(self._framer.feed(b"".join(samples)).values)
+
+
+def uart_tab(backend: str, x_range: int = 10_000, figsize=(12, 6)) -> Harness:
+    if backend == "tk":
+        root = _tk_root()
+        harness = _tk_harness(root, ble_uart_service_tab.UARTServiceTab(root))
+        plotter = harness.target.plotter
+        plotter.range_scale.set(math.log10(x_range))
+        plotter._set_x_range()
+        plotter.start_plotting()
+        return harness
+
+    # Same steps as UARTPlotterTab.__init__, on an Agg canvas
+    cls = ble_uart_service_tab.UARTPlotterTab
+    plotter = cls.__new__(cls)
+    plotter._fig = Figure(dpi=100, figsize=figsize)
+    plotter._fig.set_tight_layout(True)
+    plotter._history = RingBuffer(ble_uart_service_tab.MAX_DATA_POINTS, ['y'])
+    plotter._ax = plotter._fig.add_subplot(111)
+    plotter._setup_axis()
+    plotter._line, = plotter._ax.plot([], [], color='red')
+    plotter._canvas = FigureCanvasAgg(plotter._fig)  # draw_idle draws right away
+    plotter._canvas.draw()
+    plotter.range_scale = _Widget(math.log10(x_range))
+    plotter.range_label = _Widget()
+    plotter._plot = True
+    plotter._set_x_range()
+    return Harness(_UARTStream(plotter), lambda: None, lambda: None)
+
+
+def devices_box(backend: str, visible_rows: int = 25, lookup=None) -> Harness:
+    from src import connection_tab
+
+    cls = connection_tab.DevicesBox
+    if backend == "tk":
+        root = _tk_root()
+        return _tk_harness(root, cls(root, label_text="Discovered Devices", lookup=lookup))
+
+    # Same state as DevicesBox.__init__ after a resize to `visible_rows` rows
+    box = cls.__new__(cls)
+    box._command = None
+    box._sort_command = None
+    box._lookup = lookup
+    box._devices = {}
+    box._order = []
+    box._sort_by = connection_tab.DEFAULT_DEVICES_SORT
+    box._selected_address = None
+    box._first = 0
+    box._visible = visible_rows
+    box._rows = [_Widget() for _ in range(visible_rows)]
+    box._rows_state = [None] * visible_rows
+    box._scrollbar = _Widget()
+    box._row_color = "gray"
+    box._select_color = "blue"
+    return Harness(box, lambda: None, lambda: None)
+
+
+def percentiles(latencies: List[float], prefix: str = "latency") -> Dict[str, float]:
+    # Latencies in seconds, reported in milliseconds
+    values = np.asarray(latencies) * 1000.0
+    return {
+        f"{prefix}_p50_ms": float(np.percentile(values, 50)),
+        f"{prefix}_p95_ms": float(np.percentile(values, 95)),
+        f"{prefix}_p99_ms": float(np.percentile(values, 99)),
+        f"{prefix}_max_ms": float(values.max()),
+    }
+
+
+def timed(function, iterations: int) -> List[float]:
+    latencies = []
+    for index in range(iterations):
+        start = time.perf_counter()
+        function(index)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def memory_growth(function, warmup: int, iterations: int) -> Dict[str, float]:
+    # Memory allocated by Python that is still alive after `iterations` calls, once the caches are warm
+    for index in range(warmup):
+        function(index)
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for index in range(iterations):
+            function(warmup + index)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "memory_growth_bytes": float(after - before),
+        "memory_growth_per_update_bytes": float(after - before) / iterations,
+        "memory_peak_bytes": float(peak - before),
+    }
@@ -0,0 +1,245 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict
+
+from src.radio import RADIO_ENV_VAR
+
+os.environ.setdefault(RADIO_ENV_VAR, "sim")  # Importing the connection tab must not need an adapter
+
+import matplotlib  # noqa: E402
+
+from benchmarks import harness  # noqa: E402
+from src.device_table import DeviceTable  # noqa: E402
+from src.exemples.ble_json_service import ExJSONService  # noqa: E402
+from src.exemples.ble_packed_service import SENSOR_SCHEMA  # noqa: E402
+from src.simulator import (  # noqa: E402
+    SimulatedRadio, SimulatorConfig, SimulatedUARTService, SimulatedJSONService, SimulatedPackedService)
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEVICE_COUNTS = (10, 100, 300, 1000)
+DEVICES_SEEN_PER_REFRESH = 10  # Advertising between two refreshes in the "_few_seen" runs of device_list
+UART_NOTIFICATIONS_PER_FRAME = 50  # About 1500 notifications/s at 30 frames per second
+SENSOR_SAMPLES_PER_FRAME = 30  # Records decoded at once by the packed tab
+
+
+class Settings:
+    def __init__(self, backend: str, quick: bool):
+        self.backend = backend
+        self.scale = 0.2 if quick else 1.0  # --quick runs fewer iterations, for a smoke check
+
+    def iterations(self, count: int) -> int:
+        return max(10, int(count * self.scale))
+
+
+def _json_payloads(count: int):
+    config = SimulatorConfig(latency=0.0)
+    service = SimulatedJSONService(config, SimulatedRadio(config)._rng, _ConnectedStub())
+    return [service.read() for _ in range(count)]
+
+
+def _packed_payloads(count: int):
+    config = SimulatorConfig(latency=0.0)
+    service = SimulatedPackedService(config, SimulatedRadio(config)._rng, _ConnectedStub())
+    return [service.read() for _ in range(count)]
+
+
+def _uart_frames(count: int, payload: int = 20):
+    config = SimulatorConfig(latency=0.0, uart_payload=payload)
+    service = SimulatedUARTService(config, SimulatedRadio(config)._rng, _ConnectedStub())
+    return [[service._next_payload() for _ in range(UART_NOTIFICATIONS_PER_FRAME)] for _ in range(count)]
+
+
+class _ConnectedStub:
+    connected = True
+
+    def check(self):
+        pass
+
+
+def bench_json_render(settings: Settings) -> Dict[str, float]:
+    # ExJSONServiceTab._update_plot, one sample per frame as delivered by the UIDispatcher
+    iterations = settings.iterations(300)
+    payloads = _json_payloads(iterations)
+    tab = harness.json_tab(settings.backend)
+    try:
+        def update(index):
+            tab.target.update_data_batch([payloads[index]])
+            tab.pump()
+
+        latencies = harness.timed(update, iterations)
+    finally:
+        tab.close()
+    return {"samples_per_s": iterations / sum(latencies), **harness.percentiles(latencies)}
+
+
+def bench_json_memory(settings: Settings) -> Dict[str, float]:
+    iterations = settings.iterations(500)
+    payloads = _json_payloads(50)
+    tab = harness.json_tab(settings.backend)
+    try:
+        def update(index):
+            tab.target.update_data_batch([payloads[index % len(payloads)]])
+            tab.pump()
+
+        return harness.memory_growth(update, warmup=100, iterations=iterations)
+    finally:
+        tab.close()
+
+
+def bench_sensor_decode(settings: Settings) -> Dict[str, float]:
+    # The same sensor values as JSON text and as SENSOR_SCHEMA records: bytes per sample and decode throughput, one
+    # record at a time (ExJSONService.decode, PackedSchema.unpack) and by frame (PackedSchema.unpack_many)
+    iterations = settings.iterations(20_000)
+    json_payloads = _json_payloads(SENSOR_SAMPLES_PER_FRAME)
+    packed_payloads = _packed_payloads(SENSOR_SAMPLES_PER_FRAME)
+    decoder = ExJSONService.__new__(ExJSONService)  # `decode` does not use the _bleio service
+    frame = b"".join(packed_payloads)
+
+    def throughput(decode, samples_per_call: int = 1) -> float:
+        calls = max(1, iterations // samples_per_call)
+        start = time.perf_counter()
+        for index in range(calls):
+            decode(index % SENSOR_SAMPLES_PER_FRAME)
+        return calls * samples_per_call / (time.perf_counter() - start)
+
+    return {
+        "json_payload_bytes": sum(len(payload) for payload in json_payloads) / len(json_payloads),
+        "packed_payload_bytes": SENSOR_SCHEMA.size,
+        "json_decode_per_s": throughput(lambda index: decoder.decode(json_payloads[index])),
+        "packed_decode_per_s": throughput(lambda index: SENSOR_SCHEMA.unpack(packed_payloads[index])),
+        "packed_batch_decode_per_s": throughput(lambda index: SENSOR_SCHEMA.unpack_many(frame),
+                                                SENSOR_SAMPLES_PER_FRAME),
+    }
+
+
+def bench_uart_stream(settings: Settings) -> Dict[str, float]:
+    # LineFramer and UARTPlotterTab for a frame worth of notifications, with a 10k samples window
+    iterations = settings.iterations(100)
+    frames = _uart_frames(iterations)
+    tab = harness.uart_tab(settings.backend)
+    try:
+        def update(index):
+            tab.target.update_data_batch(frames[index])
+            tab.pump()
+
+        latencies = harness.timed(update, iterations)
+    finally:
+        tab.close()
+    payload_bytes = sum(len(payload) for frame in frames for payload in frame)
+    return {
+        "notifications_per_s": iterations * UART_NOTIFICATIONS_PER_FRAME / sum(latencies),
+        "bytes_per_s": payload_bytes / sum(latencies),
+        **harness.percentiles(latencies),
+    }
+
+
+def bench_uart_memory(settings: Settings) -> Dict[str, float]:
+    # Long run: the history ring buffer is filled up first, after that memory must stay flat
+    iterations = settings.iterations(1000)
+    frames = _uart_frames(100)
+    tab = harness.uart_tab(settings.backend)
+    try:
+        def update(index):
+            tab.target.update_data_batch(frames[index % len(frames)])
+            tab.pump()
+
+        return harness.memory_growth(update, warmup=200, iterations=iterations)
+    finally:
+        tab.close()
+
+
+def bench_device_list(settings: Settings) -> Dict[str, float]:
+    # ConnectionTab._update_devices_list (DeviceTable.collect_changes, DevicesBox.apply_changes and refresh_visible)
+    # with every device advertising once between two refreshes, then with only DEVICES_SEEN_PER_REFRESH of them
+    results = {}
+    refreshes = settings.iterations(50)
+    for count in DEVICE_COUNTS:
+        for seen, suffix in ((count, ""), (min(count, DEVICES_SEEN_PER_REFRESH), "_few_seen")):
+            radio = SimulatedRadio(SimulatorConfig(advertisers=count, advertising_rate=1000.0))
+            advertisers = list(radio._advertisers.values())
+            table = DeviceTable(timeout=3600)
+            box = harness.devices_box(settings.backend, lookup=table.get)
+            try:
+                now = time.time()
+                latencies = []
+                for refresh in range(refreshes):
+                    if refresh == 0:
+                        batch = advertisers  # Adds all
+                    else:
+                        first = (refresh * seen) % count
+                        batch = (advertisers[first:] + advertisers[:first])[:seen]
+                    for advertiser in batch:
+                        table.observe(advertiser.advertise(radio.config, radio._rng), now=now + refresh)
+                    start = time.perf_counter()
+                    box.target.apply_changes(table.collect_changes(now=now + refresh))
+                    box.target.refresh_visible()
+                    box.pump()
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                box.close()
+            results.update(harness.percentiles(latencies[1:], prefix=f"refresh_{count}_devices{suffix}"))
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[Settings], Dict[str, float]]] = {
+    "json_render": bench_json_render,
+    "json_memory": bench_json_memory,
+    "sensor_decode": bench_sensor_decode,
+    "uart_stream": bench_uart_stream,
+    "uart_memory": bench_uart_memory,
+    "device_list": bench_device_list,
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the scan, ingest and render hot paths")
+    parser.add_argument("--backend", choices=harness.BACKENDS, default="agg")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file the results are written to")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run, all by default")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations")
+    args = parser.parse_args(argv)
+
+    if args.backend == "agg":
+        matplotlib.use("Agg")
+    settings = Settings(args.backend, args.quick)
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"{name} ...", flush=True)
+        results[name] = BENCHMARKS[name](settings)
+        for metric, value in results[name].items():
+            print(f"    {metric}: {value:.4g}")
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "backend": args.backend,
+            "quick": args.quick,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "matplotlib": matplotlib.__version__,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
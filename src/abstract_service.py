@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from adafruit_ble.services import Service
 
 
@@ -8,8 +10,27 @@ def abstractmethod(method):
     return inner
 
 
+def flatten_fields(values: dict, prefix: str = "") -> Dict[str, object]:
+    # {"Color": {"Red": 1}} -> {"Color.Red": 1}
+    fields = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            fields.update(flatten_fields(value, f"{prefix}{key}."))
+        else:
+            fields[f"{prefix}{key}"] = value
+    return fields
+
+
 class AbstractService(Service):
     uuid = None
+    # Poll-based services are read every `read_interval` seconds. Push-based services receive their data through
+    # NOTIFY/INDICATE and deliver each payload as soon as it arrives (see `subscribe`).
+    push_based = False
+    read_interval = 1.0
+    # Scheduling of polled reads: when several reads are due, the highest priority goes first. A read that cannot
+    # start within `read_deadline` seconds of its slot is skipped (None: never skipped).
+    read_priority = 0
+    read_deadline = None
 
     def __init__(self, service=None):
         super().__init__(service=service)
@@ -22,5 +43,26 @@ class AbstractService(Service):
     def write(self):
         pass
 
+    def read_pending(self):
+        # Data to deliver on a polling cycle, or None. Push-based services that cannot subscribe should only
+        # return what has already been received instead of blocking.
+        return self.read()
+
+    def subscribe(self, callback) -> bool:
+        # Register `callback(data)` for pushed payloads. Returns False when the service has to be polled instead.
+        return False
+
+    def unsubscribe(self):
+        pass
+
+    def decode(self, data) -> List[Dict[str, object]]:
+        # Records (field name -> number or text) decoded from a payload, used by the command line. Override it to give
+        # the fields of the service; by default text is kept as it is and bytes are given in hexadecimal.
+        if isinstance(data, (bytes, bytearray)):
+            return [{"data": bytes(data).hex()}]
+        if isinstance(data, dict):
+            return [flatten_fields(data)]
+        return [{"data": str(data)}]
+
     def get_uuid(self) -> str:
         return str(self.uuid)
@@ -1,5 +1,10 @@
 import customtkinter as ctk
 
+# Backpressure policies applied when samples arrive faster than a tab is refreshed
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+MERGE = "merge"
+
 
 def abstractmethod(method):
     method.is_abstract = True
@@ -12,6 +17,8 @@ def abstractmethod(method):
 
 
 class AbstractServiceTab(ctk.CTkFrame):
+    backpressure_policy = None  # None: use the policy of the dispatcher
+
     def __init__(self, master, **kwargs):
         super().__init__(master, fg_color="transparent", **kwargs)
         self.grid_columnconfigure(0, weight=1)
@@ -20,3 +27,12 @@ class AbstractServiceTab(ctk.CTkFrame):
     @abstractmethod
     def update_data(self, data):
         pass
+
+    def update_data_batch(self, samples):
+        # Called once per frame with the samples received since the previous one. Override it to redraw only once.
+        for data in samples:
+            self.update_data(data)
+
+    def merge_samples(self, samples):
+        # Used by the MERGE policy to shrink a full queue, keeps only the latest sample by default
+        return samples[-1:]
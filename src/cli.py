@@ -0,0 +1,232 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import time
+from typing import Dict, List, Optional
+
+from adafruit_ble.advertising.standard import Advertisement
+
+from src.abstract_service import AbstractService
+from src.connection_manager import CONNECT_TIMEOUT
+from src.metrics import METRICS_HOST, PayloadMetrics, metrics_url, start_http_server
+from src.profiling import dump_on_exit, enable_from_env
+from src.radio import get_radio
+from src.service_discovery import discover_services
+from src.service_register import get_plugins
+from src.service_scheduler import ServiceScheduler
+
+# Command line without the GUI: scans and streams the decoded data of the registered services as JSON lines or CSV.
+# It only imports the services, never Tk or matplotlib, so it runs on a headless gateway:
+#   python -m src.cli scan --timeout 10
+#   python -m src.cli stream AA:BB:CC:DD:EE:FF --format csv --output data.csv
+FORMATS = ("jsonl", "csv")
+DEFAULT_SCAN_TIMEOUT = 10  # s
+SCAN_FIELDS = ["time", "address", "name", "rssi", "tx_power", "connectable"]
+STREAM_FIELDS = ["time", "address", "service", "field", "value"]  # CSV: one row per field of a decoded record
+CONNECTION_CHECK_INTERVAL = 0.5  # s between two checks that the device is still connected
+
+
+class JSONLinesWriter:
+    def __init__(self, file):
+        self._file = file
+
+    def write(self, row: Dict[str, object]):
+        self._file.write(json.dumps(row, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+
+class CSVWriter:
+    def __init__(self, file, fields: List[str]):
+        self._file = file
+        self._writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row: Dict[str, object]):
+        self._writer.writerow(row)
+
+    def flush(self):
+        self._file.flush()
+
+
+def _writer(output_format: str, file, fields: List[str]):
+    return CSVWriter(file, fields) if output_format == "csv" else JSONLinesWriter(file)
+
+
+def _advertisement_row(advert) -> Dict[str, object]:
+    return {
+        "time": round(time.time(), 6),
+        "address": advert.address.string,
+        "name": advert.complete_name or advert.short_name,
+        "rssi": advert.rssi,
+        "tx_power": advert.tx_power,
+        "connectable": advert.connectable,
+    }
+
+
+def scan(radio, writer, timeout: float, unique: bool):
+    seen = set()
+    for advert in radio.start_scan(Advertisement, timeout=timeout):
+        address = advert.address.string
+        if unique and address in seen:
+            continue
+        seen.add(address)
+        writer.write(_advertisement_row(advert))
+        writer.flush()
+
+
+def find_device(radio, address: str, timeout: float):
+    # Advertisement of the device, None when it was not seen within `timeout`
+    address = address.upper()
+    try:
+        for advert in radio.start_scan(Advertisement, timeout=timeout):
+            if advert.address.string.upper() == address:
+                return advert
+    finally:
+        radio.stop_scan()
+    return None
+
+
+def stream(radio, writer, output_format: str, address: str, names: Optional[List[str]], scan_timeout: float,
+           duration: Optional[float]) -> int:
+    advert = find_device(radio, address, scan_timeout)
+    if advert is None:
+        print(f"Error: {address} was not found within {scan_timeout} s", file=sys.stderr)
+        return 1
+    try:
+        connection = radio.connect(advert, timeout=CONNECT_TIMEOUT)
+    except Exception as e:
+        print(f"Error: Cannot connect to {address}: {e}", file=sys.stderr)
+        return 1
+
+    scheduler = ServiceScheduler()
+    services: Dict[str, AbstractService] = {}
+    try:
+        services = discover_services(connection, names)
+        if not services:
+            print(f"Error: No registered service found on {address}", file=sys.stderr)
+            return 1
+        print(f"Streaming {', '.join(services)} from {address}", file=sys.stderr)
+
+        # The payloads are received on the notification and scheduler threads, decoded and written on this one
+        payloads: queue.Queue = queue.Queue()
+        errors: queue.Queue = queue.Queue()
+
+        def deliverer(name: str, service: AbstractService):
+            payload_metrics = PayloadMetrics(type(service).__name__, address)
+
+            def deliver(data):
+                if data:
+                    payload_metrics.observe(data)
+                    payloads.put((time.time(), name, data))
+            return deliver
+
+        for name, service in services.items():
+            deliver = deliverer(name, service)
+            if not (service.push_based and service.subscribe(deliver)):
+                scheduler.add(service, deliver, errors.put, link=address)
+
+        end = time.monotonic() + duration if duration is not None else None
+        while connection.connected and errors.empty() and (end is None or time.monotonic() < end):
+            try:
+                item = payloads.get(timeout=CONNECTION_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            while item is not None:
+                _write_payload(writer, output_format, address, services, *item)
+                try:
+                    item = payloads.get_nowait()
+                except queue.Empty:
+                    item = None
+            writer.flush()
+
+        if not errors.empty():
+            print(f"Error: {errors.get()}", file=sys.stderr)
+            return 1
+        if not connection.connected:
+            print(f"Error: {address} disconnected", file=sys.stderr)
+            return 1
+        return 0
+    finally:
+        scheduler.stop()
+        for service in services.values():
+            service.unsubscribe()
+        if connection.connected:
+            connection.disconnect()
+
+
+def _write_payload(writer, output_format: str, address: str, services: Dict[str, AbstractService], timestamp: float,
+                   name: str, data):
+    try:
+        records = services[name].decode(data)
+    except Exception as e:
+        print(f"Error: Cannot decode a payload of {name}: {e}", file=sys.stderr)
+        return
+    for record in records:
+        if output_format == "csv":
+            for field, value in record.items():
+                writer.write({"time": round(timestamp, 6), "address": address, "service": name, "field": field,
+                              "value": value})
+        else:
+            writer.write({"time": round(timestamp, 6), "address": address, "service": name, "data": record})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="PyBLEToolkit without the GUI")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--output", help="File the rows are written to, standard output by default")
+    parser.add_argument("--metrics-port", type=int, help="Serve the metrics in the Prometheus text format on this port")
+    parser.add_argument("--metrics-host", default=METRICS_HOST, help="Address the metrics are served on")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="List the advertisements")
+    scan_parser.add_argument("--timeout", type=float, default=DEFAULT_SCAN_TIMEOUT, help="s")
+    scan_parser.add_argument("--unique", action="store_true", help="Only the first advertisement of each device")
+
+    stream_parser = commands.add_parser("stream", help="Connect to a device and stream its decoded service data")
+    stream_parser.add_argument("address")
+    stream_parser.add_argument("--service", action="append", dest="services",
+                               choices=[plugin.name for plugin in get_plugins().values()],
+                               help="Service to stream, can be repeated, all the registered ones by default")
+    stream_parser.add_argument("--scan-timeout", type=float, default=DEFAULT_SCAN_TIMEOUT, help="s")
+    stream_parser.add_argument("--duration", type=float, help="s, until interrupted by default")
+    args = parser.parse_args(argv)
+
+    enable_from_env()  # With PYBLETOOLKIT_PROFILE
+    metrics_server = None
+    if args.metrics_port is not None:
+        try:
+            metrics_server = start_http_server(args.metrics_port, args.metrics_host)
+        except OSError as e:
+            print(f"Error: Cannot serve the metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+            return 1
+        print(f"Metrics served on {metrics_url(metrics_server)}", file=sys.stderr)
+
+    file = open(args.output, "w", newline="") if args.output else sys.stdout
+    radio = get_radio()
+    try:
+        if args.command == "scan":
+            scan(radio, _writer(args.format, file, SCAN_FIELDS), args.timeout, args.unique)
+            return 0
+        return stream(radio, _writer(args.format, file, STREAM_FIELDS), args.format, args.address, args.services,
+                      args.scan_timeout, args.duration)
+    except KeyboardInterrupt:
+        return 0
+    except BrokenPipeError:  # The reader went away, e.g. piped to head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        radio.stop_scan()
+        if file is not sys.stdout:
+            file.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        dump_on_exit()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import threading
+from enum import Enum
+from typing import Dict, List, Optional
+
+CONNECT_TIMEOUT = 3  # s per attempt
+CONNECT_ATTEMPTS = 4
+BACKOFF_INITIAL = 0.5  # s before the second attempt
+BACKOFF_FACTOR = 2
+BACKOFF_MAX = 4  # s
+MAX_CONNECTIONS = 4  # Devices connected at the same time
+
+
+class ConnectionState(Enum):
+    IDLE = "Idle"
+    CONNECTING = "Connecting"
+    DISCOVERING = "Discovering services"
+    READY = "Connected"
+    DISCONNECTING = "Disconnecting"
+
+
+class ConnectionCancelled(Exception):
+    pass
+
+
+class ConnectionManager:
+    # Connects and disconnects a device off the Tk thread, through the states
+    # IDLE -> CONNECTING -> DISCOVERING -> READY -> DISCONNECTING -> IDLE.
+    # The public methods are called from the Tk thread, the callbacks are handed to `schedule(callback, *args)` so
+    # they run there too:
+    # - on_state(state, detail): progress, `detail` is a short message for the user
+    # - on_ready(advertisement, connection, services): `services` is what `discover(connection)` returned
+    # - on_failed(advertisement, error): the connect failed, `error` is None when it was cancelled
+    # - on_disconnected(advertisement)
+    # A failed attempt is retried up to `attempts` times, waiting `backoff * backoff_factor ** n` (at most
+    # `backoff_max`) seconds in between. A cancel takes effect between two steps, an attempt in progress cannot be
+    # interrupted and its connection is closed once it returns.
+    def __init__(self, radio, schedule, discover, prepare=None, on_state=None, on_ready=None, on_failed=None,
+                 on_disconnected=None, attempts=CONNECT_ATTEMPTS, timeout=CONNECT_TIMEOUT, backoff=BACKOFF_INITIAL,
+                 backoff_factor=BACKOFF_FACTOR, backoff_max=BACKOFF_MAX):
+        self._radio = radio
+        self._schedule = schedule
+        self._discover = discover
+        self._prepare = prepare  # Called by the worker before connecting, e.g. to wait for the scanner to stop
+        self._on_state = on_state
+        self._on_ready = on_ready
+        self._on_failed = on_failed
+        self._on_disconnected = on_disconnected
+        self._attempts = max(1, attempts)
+        self._timeout = timeout
+        self._backoff = backoff
+        self._backoff_factor = backoff_factor
+        self._backoff_max = backoff_max
+
+        self._state = ConnectionState.IDLE
+        self._advertisement = None
+        self._connection = None
+        self._cancel_event = threading.Event()  # One per connect, set to cancel it
+        self._worker = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> ConnectionState:
+        return self._state
+
+    @property
+    def advertisement(self):
+        return self._advertisement
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def busy(self) -> bool:
+        return self._state in (ConnectionState.CONNECTING, ConnectionState.DISCOVERING, ConnectionState.DISCONNECTING)
+
+    def _notify(self, callback, *args):
+        if callback is not None:
+            self._schedule(callback, *args)
+
+    def _set_state(self, state: ConnectionState, detail: str, cancel_event: threading.Event = None):
+        # Raises ConnectionCancelled instead when the operation of `cancel_event` has been cancelled
+        with self._lock:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ConnectionCancelled()
+            self._state = state
+        self._notify(self._on_state, state, detail)
+
+    def _run(self, target, *args):
+        # Operations run one after the other, each in its own thread
+        previous = self._worker
+
+        def run():
+            if previous is not None:
+                previous.join()
+            target(*args)
+
+        self._worker = threading.Thread(target=run, daemon=True)
+        self._worker.start()
+
+    def connect(self, advertisement) -> bool:
+        # The services of a ready connection have to be stopped by the caller, its link is closed before connecting
+        if self.busy:
+            return False
+        previous = self._connection
+        self._connection = None
+        self._advertisement = advertisement
+        self._cancel_event = threading.Event()
+        self._set_state(ConnectionState.CONNECTING, "Connecting ...")
+        self._run(self._connect_worker, advertisement, previous, self._cancel_event)
+        return True
+
+    def cancel(self) -> bool:
+        with self._lock:
+            if self._state not in (ConnectionState.CONNECTING, ConnectionState.DISCOVERING):
+                return False
+            self._cancel_event.set()
+            self._state = ConnectionState.IDLE
+        self._notify(self._on_state, ConnectionState.IDLE, "Connection cancelled")
+        self._notify(self._on_failed, self._advertisement, None)
+        return True
+
+    def disconnect(self) -> bool:
+        # The services of the connection have to be stopped by the caller
+        with self._lock:
+            if self._state is not ConnectionState.READY:
+                return False
+            connection = self._connection
+            self._connection = None
+        self._set_state(ConnectionState.DISCONNECTING, "Disconnecting ...")
+        self._run(self._disconnect_worker, self._advertisement, connection)
+        return True
+
+    def close(self):
+        # Synchronous teardown when the application quits
+        with self._lock:
+            self._cancel_event.set()
+            connection = self._connection
+            self._connection = None
+            self._state = ConnectionState.IDLE
+        self._close_link(connection)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return min(self._backoff * self._backoff_factor ** (attempt - 1), self._backoff_max)
+
+    def _connect_with_retry(self, advertisement, cancel_event: threading.Event):
+        for attempt in range(1, self._attempts + 1):
+            if attempt > 1:  # `connect` already reported the first one
+                self._set_state(ConnectionState.CONNECTING, f"Connecting ... (attempt {attempt}/{self._attempts})",
+                                cancel_event)
+            elif cancel_event.is_set():
+                raise ConnectionCancelled()
+            try:
+                connection = self._radio.connect(advertisement, timeout=self._timeout)
+                if connection is not None and connection.connected:
+                    return connection
+                error = ConnectionError("Not connected")
+            except Exception as e:
+                error = e
+            print(f"ConnectionManager: Attempt {attempt}/{self._attempts} failed: {error}")
+            if attempt == self._attempts:
+                raise error
+            if cancel_event.wait(self._backoff_delay(attempt)):
+                raise ConnectionCancelled()
+
+    def _connect_worker(self, advertisement, previous, cancel_event: threading.Event):
+        connection = None
+        try:
+            self._close_link(previous)
+            if self._prepare is not None:
+                self._prepare()
+            connection = self._connect_with_retry(advertisement, cancel_event)
+            self._set_state(ConnectionState.DISCOVERING, "Discovering services ...", cancel_event)
+            services = self._discover(connection)
+            with self._lock:
+                if cancel_event.is_set():
+                    raise ConnectionCancelled()
+                self._connection = connection
+                self._state = ConnectionState.READY
+            self._notify(self._on_state, ConnectionState.READY, "Connected")
+            self._notify(self._on_ready, advertisement, connection, services)
+        except ConnectionCancelled:
+            self._close_link(connection)  # `cancel` already went back to IDLE
+        except Exception as e:
+            print(f"Connection failed due to unexpected error: {e}")
+            self._close_link(connection)
+            with self._lock:
+                if cancel_event.is_set():
+                    return
+                self._state = ConnectionState.IDLE
+            self._notify(self._on_state, ConnectionState.IDLE, "Connection failed")
+            self._notify(self._on_failed, advertisement, e)
+
+    def _disconnect_worker(self, advertisement, connection):
+        self._close_link(connection)
+        with self._lock:
+            self._state = ConnectionState.IDLE
+        self._notify(self._on_state, ConnectionState.IDLE, "Disconnected")
+        self._notify(self._on_disconnected, advertisement)
+
+    @staticmethod
+    def _close_link(connection):
+        if connection is None:
+            return
+        try:
+            if connection.connected:
+                connection.disconnect()
+        except Exception as e:
+            print(f"Disconnection failed due to unexpected error: {e}")
+
+
+class ConnectionPool:
+    # Up to `max_connections` devices connected at the same time, each through its own ConnectionManager keyed by
+    # address. The callbacks are those of ConnectionManager, `on_state` also receives the address first:
+    # on_state(address, state, detail).
+    def __init__(self, max_connections=MAX_CONNECTIONS, on_state=None, **manager_kwargs):
+        self._max_connections = max_connections
+        self._on_state = on_state
+        self._manager_kwargs = manager_kwargs
+        self._managers: Dict[str, ConnectionManager] = {}
+
+    def __len__(self) -> int:
+        # Devices connected or on their way
+        return sum(1 for manager in self._managers.values() if manager.state is not ConnectionState.IDLE)
+
+    @property
+    def full(self) -> bool:
+        return len(self) >= self._max_connections
+
+    def get(self, address: str) -> Optional[ConnectionManager]:
+        return self._managers.get(address)
+
+    def state(self, address: str) -> ConnectionState:
+        manager = self._managers.get(address)
+        return manager.state if manager is not None else ConnectionState.IDLE
+
+    def connected_addresses(self) -> List[str]:
+        return [address for address, manager in self._managers.items() if manager.state is ConnectionState.READY]
+
+    def connect(self, advertisement) -> bool:
+        address = advertisement.address.string
+        manager = self._managers.get(address)
+        if manager is None:
+            on_state = None
+            if self._on_state is not None:
+                on_state = lambda state, detail: self._on_state(address, state, detail)
+            manager = self._managers[address] = ConnectionManager(on_state=on_state, **self._manager_kwargs)
+        if manager.state is not ConnectionState.IDLE or self.full:
+            return False
+        return manager.connect(advertisement)
+
+    def cancel(self, address: str) -> bool:
+        manager = self._managers.get(address)
+        return manager is not None and manager.cancel()
+
+    def disconnect(self, address: str) -> bool:
+        manager = self._managers.get(address)
+        return manager is not None and manager.disconnect()
+
+    def close(self):
+        for manager in self._managers.values():
+            manager.close()
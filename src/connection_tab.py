@@ -1,89 +1,217 @@
 import threading
 import time
-from collections import defaultdict
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional
 
 import customtkinter as ctk
-from CTkListbox import CTkListbox
-from adafruit_ble import BLERadio, BLEConnection
 from adafruit_ble.advertising.standard import Advertisement
 
+from src.connection_manager import ConnectionPool, ConnectionState
+from src.device_table import DeviceTable, DeviceInfo, DeviceChanges, LAST_SEEN_RESOLUTION
+from src.metrics import SCANNER_ADVERTISEMENTS, SCANNER_DEVICES
+from src.radio import get_radio
 from src.utils import TRANSPARENT_COLOR, STD_PADDING
 
-BLE = BLERadio()
-STOP_SCAN_SLEEP_TIME = 1.5
-DEVICE_TIMEOUT = 5
-SCAN_TIMEOUT = 2
+BLE = get_radio()  # The adapter, or the simulator with PYBLETOOLKIT_RADIO=sim
+SCAN_INTERVAL = 0.1  # s between the start of two scan windows
+SCAN_WINDOW = 0.1  # s listening on a channel, equal to SCAN_INTERVAL to scan continuously
+SCAN_CHUNK = 0.25  # s per start_scan call, one scan interval of Blinka, the stop event is checked between two
+SCAN_RETRY_DELAY = 1  # s before restarting a scan that failed
+SCAN_STOP_TIMEOUT = 1  # s to wait for the scanner to release the adapter before connecting
+DEVICES_REFRESH_INTERVAL = 500  # ms between two updates of the devices list while scanning
 MESSAGE_TIMEOUT = 2
-
-
-class DevicesBox(CTkListbox):
-    def __init__(self, master, **kwargs):
+DEVICE_INFO_REFRESH_INTERVAL = 500  # ms between two refreshes of the selected device information
+DEVICES_ROW_HEIGHT = 32  # px, including the spacing between two rows
+DEVICES_WHEEL_ROWS = 3  # Rows scrolled per mouse wheel step
+LAST_SEEN_SORT = "Last seen"  # The only order changing each time a device is seen again
+DEVICES_SORT_KEYS = {  # Strongest, alphabetical (unnamed last) and most recently seen first, all end with the address
+    "RSSI": lambda device: (device.rssi is None, -(device.rssi or 0), device.address),
+    "Name": lambda device: (device.name is None, (device.name or "").lower(), device.address),
+    LAST_SEEN_SORT: lambda device: (-device.last_seen, device.address),
+}
+DEFAULT_DEVICES_SORT = "RSSI"
+
+
+class DevicesBox(ctk.CTkFrame):
+    # Virtualized list of the discovered devices: only the rows that fit in the frame are real buttons, scrolling
+    # relabels them. The model is a dict of DeviceInfo by address plus the sorted list of their sort keys, kept in
+    # order with bisect so applying the scanner changes costs time proportional to the changes. The list is only sorted
+    # again when the sort column changes, and sorting never creates or destroys widgets. The selection is tracked by
+    # address. `lookup` gives the latest DeviceInfo of an address, the visible rows are refreshed with it.
+    def __init__(self, master, command=None, label_text="", sort_by=DEFAULT_DEVICES_SORT,
+                 sort_command=None, lookup: Optional[Callable[[str], Optional[DeviceInfo]]] = None, **kwargs):
         super().__init__(master, **kwargs)
-        self.selected = None
-
-    def add_item(self, display_text):
-        self.insert("end", display_text)
-
-    def remove_item(self, display_text):
-        for index in range(self.size()):
-            if self.get(index) == display_text:
-                self.delete(index)
-                return
-
-    def clear(self):
-        self.clear_selection()
-        while self.size() > 0:
-            self.delete(0)
-
-    def sort_items(self, reverse=False):
-        items = [self.get(i) for i in range(self.size())]
-        items.sort(reverse=reverse)
-        self.clear()
-        for item in items:
-            self.add_item(item)
-
-    def update_item(self, old_display_text, new_display_text=None):
-        for index in range(self.size()):
-            if self.get(index) == old_display_text and new_display_text:
-                self.delete(index)
-                self.insert(index, new_display_text)
-
-    def update_items(self, items_to_add, items_to_remove):
-        for item in items_to_add:
-            self.add_item(item)
-        for item in items_to_remove:
-            self.remove_item(item)
-
-    def get_all_items(self):
-        return [self.get(i) for i in range(self.size())]
-
-    def select(self, index):  # Override
-        """select the option"""
-        for options in self.buttons.values():
-            options.configure(fg_color=self.button_fg_color)
-
-        if isinstance(index, int):
-            if index in self.buttons:
-                selected_button = self.buttons[index]
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        self._command = command  # Called with the address of the selected device
+        self._sort_command = sort_command  # Called with the new sort column
+        self._lookup = lookup
+
+        self._devices: Dict[str, DeviceInfo] = {}
+        self._order: List[tuple] = []  # Sort keys in display order, the address is the last item of each
+        self._sort_by = sort_by
+        self._selected_address = None
+        self._first = 0  # Model index of the first visible row
+        self._visible = 0
+        self._rows: List[ctk.CTkButton] = []  # Pool of row widgets, never shrinks
+        self._rows_state = []  # (text, selected) currently displayed by each row
+
+        header = ctk.CTkFrame(master=self, fg_color=TRANSPARENT_COLOR)
+        header.grid(row=0, column=0, columnspan=2, padx=STD_PADDING, pady=STD_PADDING, sticky="ew")
+        header.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(master=header, text=label_text, anchor="w").grid(row=0, column=0, sticky="w")
+        self._sort_button = ctk.CTkSegmentedButton(master=header, values=list(DEVICES_SORT_KEYS),
+                                                   command=self.sort_items)
+        self._sort_button.set(sort_by)
+        self._sort_button.grid(row=0, column=1, sticky="e")
+
+        self._rows_frame = ctk.CTkFrame(master=self, fg_color=TRANSPARENT_COLOR)
+        self._rows_frame.grid(row=1, column=0, padx=(STD_PADDING, 0), pady=(0, STD_PADDING), sticky="nsew")
+        self._rows_frame.grid_columnconfigure(0, weight=1)
+        self._rows_frame.bind("<Configure>", self._on_resize)
+        self._bind_mouse_wheel(self._rows_frame)
+        self._scrollbar = ctk.CTkScrollbar(master=self, command=self._yview)
+        self._scrollbar.grid(row=1, column=1, pady=(0, STD_PADDING), sticky="ns")
+
+        self._row_color = ctk.ThemeManager.theme["CTkFrame"]["top_fg_color"]
+        self._select_color = ctk.ThemeManager.theme["CTkButton"]["fg_color"]
+
+    @staticmethod
+    def display_text(device: DeviceInfo, now: float) -> str:
+        text = f"{device.address} ({device.name})" if device.name else device.address
+        if device.rssi is not None:
+            text = f"{text}    {device.rssi} dBm"
+        age = now - device.last_seen
+        return f"{text}    seen {age:.0f} s ago" if age >= LAST_SEEN_RESOLUTION else text
+
+    def _bind_mouse_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mouse_wheel)
+        widget.bind("<Button-4>", self._on_mouse_wheel)  # X11
+        widget.bind("<Button-5>", self._on_mouse_wheel)
+
+    def _on_mouse_wheel(self, event):
+        direction = -1 if event.num == 4 or event.delta > 0 else 1
+        self._scroll_to(self._first + direction * DEVICES_WHEEL_ROWS)
+
+    def _yview(self, action, amount, unit=None):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", count, "units" | "pages")
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * len(self._order)))
+        elif action == "scroll":
+            self._scroll_to(self._first + int(amount) * (self._visible if unit == "pages" else 1))
+
+    def _scroll_to(self, first):
+        self._first = first
+        self._render()
+
+    def _on_resize(self, event):
+        self._visible = max(1, event.height // DEVICES_ROW_HEIGHT)
+        while len(self._rows) < self._visible:
+            index = len(self._rows)
+            row = ctk.CTkButton(master=self._rows_frame, text="", anchor="w", height=DEVICES_ROW_HEIGHT - 4,
+                                fg_color=self._row_color, command=lambda i=index: self._on_row_click(i))
+            self._bind_mouse_wheel(row)
+            self._rows.append(row)
+            self._rows_state.append(None)
+        for index, row in enumerate(self._rows):
+            if index < self._visible:
+                row.grid(row=index, column=0, pady=(0, 4), sticky="ew")
+            else:
+                row.grid_remove()
+        self._render()
+
+    def _render(self):
+        # Relabels the visible rows, a row is only reconfigured when what it shows changes
+        count = len(self._order)
+        self._first = max(0, min(self._first, count - self._visible))
+        now = time.time()
+        for index in range(self._visible):
+            position = self._first + index
+            if position < count:
+                address = self._order[position][-1]
+                state = (self.display_text(self._devices[address], now), address == self._selected_address)
             else:
-                selected_button = list(self.buttons.values())[index]
+                state = ("", False)
+            if state != self._rows_state[index]:
+                self._rows_state[index] = state
+                text, selected = state
+                self._rows[index].configure(text=text, state=ctk.NORMAL if text else ctk.DISABLED,
+                                            fg_color=self._select_color if selected else self._row_color)
+        if count:
+            self._scrollbar.set(self._first / count, min(1.0, (self._first + self._visible) / count))
         else:
-            selected_button = self.buttons[index]
+            self._scrollbar.set(0.0, 1.0)
 
-        self.selected = selected_button
-        selected_button.configure(fg_color=self.select_color, hover=False)
-        self.after(0, lambda: selected_button.configure(hover=self.hover))
+    def _on_row_click(self, index):
+        position = self._first + index
+        if position < len(self._order):
+            self.select(self._order[position][-1])
 
-        if self.command:
-            self.command(self.selected.cget("text"))
-
-        self.event_generate("<<ListboxSelect>>")
+    def select(self, address: str):
+        self._selected_address = address
+        self._render()
+        if self._command:
+            self._command(address)
 
     def clear_selection(self):
-        """Clear the current selection"""
-        if self.selected:
-            self.selected.configure(fg_color=self.button_fg_color)
-            self.selected = None
+        self._selected_address = None
+        self._render()
+
+    def _remove_key(self, device: DeviceInfo):
+        key = DEVICES_SORT_KEYS[self._sort_by](device)
+        position = bisect_left(self._order, key)
+        if position < len(self._order) and self._order[position] == key:
+            del self._order[position]
+
+    def sort_items(self, sort_by: str):
+        # The only full sort, the model is first brought up to date since the keys of the other columns were not kept
+        self._sort_by = sort_by
+        if self._sort_command:
+            self._sort_command(sort_by)
+        if self._lookup is not None:
+            for address in list(self._devices):
+                device = self._lookup(address)
+                if device is not None:
+                    self._devices[address] = device
+        key = DEVICES_SORT_KEYS[sort_by]
+        self._order = sorted(key(device) for device in self._devices.values())
+        self._render()
+
+    def apply_changes(self, changes: DeviceChanges):
+        key = DEVICES_SORT_KEYS[self._sort_by]
+        for address in changes.removed:
+            device = self._devices.pop(address, None)
+            if device is not None:
+                self._remove_key(device)
+            if address == self._selected_address:
+                self._selected_address = None
+        for device in changes.added + changes.updated:
+            previous = self._devices.get(device.address)
+            self._devices[device.address] = device
+            if previous is not None:
+                if key(previous) == key(device):
+                    continue  # Same place
+                self._remove_key(previous)
+            insort(self._order, key(device))
+        self._render()
+
+    def refresh_visible(self):
+        # Shows the latest values of the devices in view, e.g. how long ago they were seen, the other rows are only
+        # updated by the reported changes. A device whose sort key changed keeps its place until it is reported.
+        if self._lookup is not None:
+            key = DEVICES_SORT_KEYS[self._sort_by]
+            for sort_key in self._order[self._first:self._first + self._visible]:
+                device = self._lookup(sort_key[-1])
+                if device is not None and key(device) == sort_key:
+                    self._devices[device.address] = device
+        self._render()
+
+    def clear(self):
+        self._devices.clear()
+        self._order = []
+        self._selected_address = None
+        self._first = 0
+        self._render()
 
 
 class MessageLabel(ctk.CTkLabel):
@@ -129,6 +257,7 @@ class InfoFrame(ctk.CTkFrame):
         self._tx_power_entry = self._create_label_entry(3, "Tx Power")
         self._complete_name_entry = self._create_label_entry(4, "Name")
         self._short_name_entry = self._create_label_entry(5, "Short Name")
+        self._displayed_values = {}  # Entry -> displayed text, to leave unchanged entries alone
 
     def _create_label_entry(self, row, text, entry_width=300, state="readonly"):
         label = ctk.CTkLabel(master=self, text=text, anchor="w")
@@ -137,16 +266,20 @@ class InfoFrame(ctk.CTkFrame):
         entry.grid(row=row, column=1, padx=(STD_PADDING, 0), pady=STD_PADDING, sticky="nsew")
         return entry
 
-    def update_entries(self, advertisement: Advertisement):
+    def update_entries(self, advertisement: Advertisement, rssi=None):
+        # `rssi` is the smoothed RSSI, the one of the advertisement is shown when it is None
         self._update_entry(self._address_entry, advertisement.address.string)
         self._update_entry(self._connectable_entry, str(advertisement.connectable))
-        self._update_entry(self._rssi_entry, str(advertisement.rssi))
+        self._update_entry(self._rssi_entry, str(rssi if rssi is not None else advertisement.rssi))
         tx_power_value = advertisement.tx_power
         self._update_entry(self._tx_power_entry, str(tx_power_value if tx_power_value is not None else "N/A"))
         self._update_entry(self._complete_name_entry, advertisement.complete_name or "")
         self._update_entry(self._short_name_entry, advertisement.short_name or "")
 
     def _update_entry(self, entry, value):
+        if self._displayed_values.get(entry) == value:
+            return
+        self._displayed_values[entry] = value
         entry.configure(state=ctk.NORMAL)
         entry.delete(0, ctk.END)
         entry.insert(0, value)
@@ -161,33 +294,45 @@ class InfoFrame(ctk.CTkFrame):
         self._clear_entry(self._short_name_entry)
 
     def _clear_entry(self, entry):
+        self._displayed_values.pop(entry, None)
         entry.configure(state=ctk.NORMAL)
         entry.delete(0, ctk.END)
         entry.configure(state=ctk.DISABLED)
 
 
 class ConnectionTab(ctk.CTkFrame):
-    def __init__(self, master, service_connect_command, service_disconnect_command, **kwargs):
+    def __init__(self, master, service_discover_command, service_connect_command, service_disconnect_command,
+                 device_info_command=None, **kwargs):
         super().__init__(master, **kwargs)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure((0, 2, 3, 4), weight=0)
         self.grid_rowconfigure(1, weight=4)
-        self._srv_connect_cmd = service_connect_command
-        self._srv_disconnect_cmd = service_disconnect_command
+        self._srv_connect_cmd = service_connect_command  # Called with (advertisement, connection, services)
+        self._srv_disconnect_cmd = service_disconnect_command  # Called with the address of the device
+        self._device_info_cmd = device_info_command  # Called with (advertisement, rssi) of each connected device
 
-        self._devices = defaultdict(lambda: {'last_seen': 0.0, 'advertisements': Advertisement})
+        self._devices = DeviceTable()
         self._scanning: bool = False
         self._scanning_thread = None
-        self._thread_lock = threading.Lock()
-        self._current_connection: BLEConnection = None
+        self._scan_stop_event = threading.Event()  # One per scan session, set to stop it
+        self._devices_refresh_id = None
+        self._connections = ConnectionPool(radio=BLE,
+                                           schedule=lambda callback, *args: self.after(0, callback, *args),
+                                           discover=service_discover_command,
+                                           prepare=self._wait_scan_stopped,
+                                           on_state=self._connection_state_changed,
+                                           on_ready=self._connection_ready,
+                                           on_failed=self._connection_failed,
+                                           on_disconnected=self._connection_closed)
         self._selected_advert: Advertisement = None
 
         scanning_frame = self._create_scanning_frame()
         connecting_frame = self._create_connecting_frame()
         self._progressbar = ctk.CTkProgressBar(master=self, mode="indeterminate", determinate_speed=1)
         self._message_label = MessageLabel(master=self, text="", anchor="center")
-        self._devices_box: DevicesBox = DevicesBox(master=self, justify="center", label_text="Discovered Devices",
-                                                   command=self._select_device_cmd)
+        self._devices_box: DevicesBox = DevicesBox(master=self, label_text="Discovered Devices",
+                                                   command=self._select_device_cmd,
+                                                   sort_command=self._sort_devices_cmd, lookup=self._devices.get)
 
         scanning_frame.pack(pady=STD_PADDING, padx=STD_PADDING)
         self._devices_box.pack(padx=STD_PADDING, pady=STD_PADDING, fill=ctk.BOTH, expand=True)
@@ -195,6 +340,8 @@ class ConnectionTab(ctk.CTkFrame):
         connecting_frame.pack(pady=STD_PADDING, padx=STD_PADDING, fill=ctk.BOTH)
         self._message_label.pack(padx=STD_PADDING, pady=(0, STD_PADDING), fill=ctk.BOTH)
 
+        self.after(DEVICE_INFO_REFRESH_INTERVAL, self._refresh_device_info)
+
     def _create_scanning_frame(self):
         buttons_frame = ctk.CTkFrame(master=self, fg_color=TRANSPARENT_COLOR)
         buttons_frame.grid_columnconfigure(0, weight=1)
@@ -210,22 +357,34 @@ class ConnectionTab(ctk.CTkFrame):
     def _start_scanning_cmd(self):
         if not self._scanning:
             self._scanning = True
-            if self._scanning_thread is None:
-                self._scanning_thread = threading.Thread(target=self._scan_for_devices_background, daemon=True)
-                self._scanning_thread.start()
+            self._scan_stop_event = threading.Event()
+            self._scanning_thread = threading.Thread(target=self._scan_for_devices_background,
+                                                     args=(self._scan_stop_event, self._scanning_thread), daemon=True)
+            self._scanning_thread.start()
+            self._devices_refresh_id = self.after(DEVICES_REFRESH_INTERVAL, self._refresh_devices_list)
         self._progressbar.start()
         self._scan_button.configure(state=ctk.DISABLED)
         self._stop_button.configure(state=ctk.NORMAL)
 
     def _stop_scanning_cmd(self):
+        # Returns immediately, the scanning thread stops the adapter and leaves within SCAN_CHUNK. `BLE.stop_scan()`
+        # is only called from that thread: Blinka drops its scanner while a scan interval is still running otherwise.
         if self._scanning:
             self._scanning = False
-            time.sleep(STOP_SCAN_SLEEP_TIME)
-            self._scanning_thread = None
+            self._scan_stop_event.set()
+            if self._devices_refresh_id is not None:
+                self.after_cancel(self._devices_refresh_id)
+                self._devices_refresh_id = None
+            self._update_devices_list()
         self._progressbar.stop()
         self._scan_button.configure(state=ctk.NORMAL)
         self._stop_button.configure(state=ctk.DISABLED)
 
+    def _wait_scan_stopped(self):
+        # The scanner exits within SCAN_CHUNK of its stop event
+        if self._scanning_thread is not None:
+            self._scanning_thread.join(timeout=SCAN_STOP_TIMEOUT)
+
     def _create_connecting_frame(self):
         connect_frame = ctk.CTkFrame(master=self, fg_color=TRANSPARENT_COLOR)
 
@@ -248,141 +407,161 @@ class ConnectionTab(ctk.CTkFrame):
         return connect_frame
 
     def _connect_cmd(self):
-        self._stop_scanning_cmd()
-        self._connect_button.configure(state=ctk.DISABLED)
-
-        if self._selected_advert.connectable:
-            if BLE.connected:
-                self._disconnect_cmd()
+        if self._selected_advert is None:  # Released (e.g. the list was cleared) since the buttons were updated
+            self._update_connection_buttons()  # Disabled while nothing is selected
+            return
+        address = self._selected_advert.address.string
+        if self._connections.cancel(address):  # The button cancels while connecting
+            return
 
-            self._message_label.update_message(message="Connecting ...", color="white")
+        self._stop_scanning_cmd()
 
-            if self._handle_connection():
-                self._message_label.update_message(message="Connected", color="green")
-                self._srv_connect_cmd(self._selected_advert, self._current_connection)
-                self._disconnect_button.configure(state=ctk.NORMAL)
-                self._scan_button.configure(state=ctk.DISABLED)
-            else:
-                # self._message_label.update_message(message="Not Connected", color="red", timeout=MESSAGE_TIMEOUT)
-                self._disconnect_button.configure(state=ctk.DISABLED)
-                self._release_selected_device()
-        else:
+        if not self._selected_advert.connectable:
             self._message_label.update_message(message="Not connectable", color="red", timeout=MESSAGE_TIMEOUT)
-            self._disconnect_button.configure(state=ctk.DISABLED)
             self._release_selected_device()
+        elif self._connections.full:
+            self._message_label.update_message(message="Too many connected devices", color="red",
+                                               timeout=MESSAGE_TIMEOUT)
+        else:
+            self._connections.connect(self._selected_advert)  # The other connected devices are left alone
+            self._update_connection_buttons()
 
-    def _handle_connection(self):
-        def handle_error(err):
-            print(f"Connection failed due to unexpected error: {err}")
-            self._message_label.update_message(message="Connection failed", color="red",
-                                               timeout=MESSAGE_TIMEOUT, clear_after=True)
-            return False
-
-        try:
-            self._current_connection = BLE.connect(self._selected_advert, timeout=3)
-        except Exception as e:
-            if "org.bluez.Error.InProgress" in str(e):
-                time.sleep(0.5)  # Wait before retrying
-                try:
-                    self._current_connection = BLE.connect(self._selected_advert, timeout=3)
-                except Exception as e:
-                    return handle_error(e)
-            else:
-                return handle_error(e)
+    def _connection_state_changed(self, address: str, state: ConnectionState, detail: str):
+        if state is ConnectionState.READY:
+            self._message_label.update_message(message=f"{detail}: {address}", color="green",
+                                               timeout=MESSAGE_TIMEOUT * 2, clear_after=True)
+        elif state is not ConnectionState.IDLE:  # The end of a connection is reported by the other callbacks
+            self._message_label.update_message(message=f"{detail} {address}", color="white")
+        self._update_connection_buttons()
+
+    def _is_selected(self, advert: Advertisement) -> bool:
+        return self._selected_advert is not None and \
+            self._selected_advert.address.string == advert.address.string
+
+    def _connection_ready(self, advert: Advertisement, connection, services):
+        self._srv_connect_cmd(advert, connection, services)
+        self._update_connection_buttons()
+
+    def _connection_failed(self, advert: Advertisement, error: Exception):
+        message = "Connection cancelled" if error is None else "Connection failed"
+        self._message_label.update_message(message=message, color="red", timeout=MESSAGE_TIMEOUT, clear_after=True)
+        if self._is_selected(advert):
+            self._release_selected_device()
+        self._update_connection_buttons()
 
-        return self._current_connection and self._current_connection.connected
+    def _connection_closed(self, advert: Advertisement):
+        self._message_label.update_message(message="Disconnected", color="white",
+                                           timeout=MESSAGE_TIMEOUT * 2, clear_after=True)
+        if self._is_selected(advert):
+            self._release_selected_device()
+        self._update_connection_buttons()
+        self._start_scanning_cmd()
 
     def _disconnect_cmd(self):
-        self._message_label.update_message(message="Disconnecting ...", color="white")
+        if self._selected_advert is None:  # Released (e.g. the list was cleared) since the buttons were updated
+            self._update_connection_buttons()  # Disabled while nothing is selected
+            return
+        address = self._selected_advert.address.string
+        if self._connections.state(address) is not ConnectionState.READY:
+            return
         self._disconnect_button.configure(state=ctk.DISABLED)
-
-        if self._handle_disconnection():
-            self._message_label.update_message(message="Disconnected", color="white",
-                                               timeout=MESSAGE_TIMEOUT * 2, clear_after=True)
-            self._release_selected_device()
-            self._start_scanning_cmd()
-        else:
-            self._message_label.update_message(message="Disconnection failed", color="red",
-                                               timeout=MESSAGE_TIMEOUT, clear_after=True)
-
-    def _handle_disconnection(self):
         try:
-            self._srv_disconnect_cmd()
-            if self._current_connection is not None:
-                self._current_connection.disconnect()
-            self._current_connection = None
+            self._srv_disconnect_cmd(address)
         except Exception as e:
             print(f"Disconnection failed due to unexpected error: {e}")
-            raise e
-
-        return self._current_connection is None or not self._current_connection.connected
-
-    def _scan_for_devices_background(self):
-        while True:
-            try:
-                self._scan_for_devices_background_handler()
-                self.after(0, self._update_devices_list)
-            except Exception as e:
-                print(f"Error during continuous scan: {e}")
-                self._message_label.update_message(message="Error during scan", color="red",
-                                                   timeout=MESSAGE_TIMEOUT, clear_after=True)
-            finally:
-                BLE.stop_scan()
-                if not self._scanning:
-                    break
-
-    def _scan_for_devices_background_handler(self):
-        for adv in BLE.start_scan(Advertisement, timeout=SCAN_TIMEOUT):
-            address = adv.address.string
-            with self._thread_lock:
-                if address not in self._devices:
-                    self._devices[address] = dict(last_seen=time.time(), advertisements=adv)
-                else:
-                    self._devices[address]['last_seen'] = time.time()
-
-    def _get_detected_devices(self):
-        detected_devices = set()
-        for address, info in self._devices.items():
-            adv = info['advertisements']
-            if adv.complete_name:
-                device_str = f"{address} ({adv.complete_name})"
-            else:
-                device_str = f"{address}"
-            detected_devices.add(device_str)
-        return detected_devices
+        self._connections.disconnect(address)  # Reported by `_connection_closed`
+
+    def _scan_for_devices_background(self, stop_event: threading.Event, previous_thread: threading.Thread):
+        # A continuous scan per session, made of consecutive SCAN_CHUNK scans so `stop_event` is checked between two
+        # of them, as Blinka scans interval after interval anyway. The advertisements go to the device table and the
+        # Tk thread picks the changes up every DEVICES_REFRESH_INTERVAL.
+        if previous_thread is not None:
+            previous_thread.join()  # Let the previous session release the adapter
+        try:
+            while not stop_event.is_set():
+                try:
+                    for adv in BLE.start_scan(Advertisement, timeout=SCAN_CHUNK, interval=SCAN_INTERVAL,
+                                              window=SCAN_WINDOW):
+                        self._devices.observe(adv)
+                        SCANNER_ADVERTISEMENTS.inc()
+                        if stop_event.is_set():
+                            break
+                except Exception as e:
+                    if stop_event.is_set():  # Failed while stopping, nothing to report
+                        break
+                    print(f"Error during continuous scan: {e}")
+                    self.after(0, lambda: self._message_label.update_message(message="Error during scan",
+                                                                             color="red", timeout=MESSAGE_TIMEOUT,
+                                                                             clear_after=True))
+                    BLE.stop_scan()  # Start over with a new scanner
+                    stop_event.wait(SCAN_RETRY_DELAY)
+        finally:
+            BLE.stop_scan()
+
+    def _refresh_devices_list(self):
+        self._update_devices_list()
+        self._devices_refresh_id = self.after(DEVICES_REFRESH_INTERVAL, self._refresh_devices_list)
 
     def _update_devices_list(self):
-        for address in list(self._devices.keys()):
-            if time.time() - self._devices[address]['last_seen'] > DEVICE_TIMEOUT:
-                del self._devices[address]
-        with self._thread_lock:
-            current_displayed_devices = set(self._devices_box.get_all_items())
-            detected_devices = self._get_detected_devices()
-
-            devices_to_add = detected_devices - current_displayed_devices
-            devices_to_remove = current_displayed_devices - detected_devices
-
-            self._devices_box.update_items(devices_to_add, devices_to_remove)
+        # The scanner thread only shares the device table, which has its own lock, the list is left to the Tk thread
+        changes = self._devices.collect_changes()
+        SCANNER_DEVICES.set(len(self._devices))
+        if changes:
+            self._devices_box.apply_changes(changes)
+            selected = self._selected_advert
+            if selected is not None and selected.address.string in changes.removed and \
+                    self._connections.state(selected.address.string) is ConnectionState.IDLE:
+                self._release_selected_device()  # Expired, a connected device keeps its selection
+        self._devices_box.refresh_visible()
+
+    def _sort_devices_cmd(self, sort_by: str):
+        # Sorting by last seen moves every device seen again, the table then reports them
+        self._devices.report_last_seen = sort_by == LAST_SEEN_SORT
 
     def quit_(self):
         self._stop_scanning_cmd()
-        self._disconnect_cmd()
-
-    def _select_device_cmd(self, selected_device: str):
-        address = selected_device.split("(")[0]
-        self._selected_advert = self._devices[address.strip()]['advertisements']
-        self._update_connection_button()
-        self._info_frame.update_entries(self._selected_advert)
-
-    def _update_connection_button(self):
-        if self._selected_advert and self._selected_advert.connectable:
-            self._connect_button.configure(state=ctk.NORMAL)
+        self._connections.close()
+
+    def _select_device_cmd(self, address: str):
+        device = self._devices.get(address)
+        if device is None:  # Expired since the list was refreshed
+            return
+        self._selected_advert = device.advertisement
+        self._update_connection_buttons()
+        self._info_frame.update_entries(device.advertisement, device.rssi)
+
+    def _refresh_device_info(self):
+        # Periodically shows the latest advertisement and RSSI of the selected and connected devices, the widgets only
+        # change when a displayed value does
+        self.after(DEVICE_INFO_REFRESH_INTERVAL, self._refresh_device_info)
+        if self._selected_advert is not None:
+            device = self._devices.get(self._selected_advert.address.string)
+            if device is not None:  # Otherwise not seen recently, e.g. while connected, keep the last values
+                self._selected_advert = device.advertisement
+                self._info_frame.update_entries(device.advertisement, device.rssi)
+        if self._device_info_cmd is not None:
+            for address in self._connections.connected_addresses():
+                device = self._devices.get(address)
+                if device is not None:
+                    self._device_info_cmd(device.advertisement, device.rssi)
+
+    def _update_connection_buttons(self):
+        # Connect, Cancel or Disconnect depending on the state of the selected device
+        state = ConnectionState.IDLE
+        if self._selected_advert is not None:
+            state = self._connections.state(self._selected_advert.address.string)
+
+        if state in (ConnectionState.CONNECTING, ConnectionState.DISCOVERING):
+            self._connect_button.configure(text="Cancel", state=ctk.NORMAL)
+        elif state is ConnectionState.IDLE and self._selected_advert is not None and \
+                self._selected_advert.connectable and not self._connections.full:
+            self._connect_button.configure(text="Connect", state=ctk.NORMAL)
         else:
-            self._connect_button.configure(state=ctk.DISABLED)
+            self._connect_button.configure(text="Connect", state=ctk.DISABLED)
+        self._disconnect_button.configure(state=ctk.NORMAL if state is ConnectionState.READY else ctk.DISABLED)
 
     def _release_selected_device(self):
         self._selected_advert = None
         self._devices_box.clear_selection()
         self._info_frame.clear_entries()
-        self._connect_button.configure(state=ctk.DISABLED)
-        self._disconnect_button.configure(state=ctk.DISABLED)
+        self._update_connection_buttons()
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def minmax_decimate(xs: np.ndarray, ys: np.ndarray, buckets: int, first_index: int = 0):
+    # Reduce a series to the minimum and maximum of `buckets` equal slices, in their original order, which keeps the
+    # envelope of the signal when drawing it on `buckets` pixels. `first_index` is the absolute index of xs[0]: the
+    # slices stay aligned on it so the drawing does not shimmer while the window slides.
+    count = len(ys)
+    if buckets <= 0 or count <= 2 * buckets:
+        return xs, ys
+
+    size = count // buckets
+    head = (-first_index) % size  # Values before the first aligned slice are kept as they are
+    full = (count - head) // size
+    tail = head + full * size
+
+    slices = ys[head:tail].reshape(full, size)
+    low, high = slices.argmin(axis=1), slices.argmax(axis=1)
+    starts = head + np.arange(full) * size
+    indices = np.empty(2 * full, dtype=np.intp)
+    indices[0::2] = starts + np.minimum(low, high)
+    indices[1::2] = starts + np.maximum(low, high)
+    indices = np.concatenate((np.arange(head), indices, np.arange(tail, count)))
+    return xs[indices], ys[indices]
@@ -0,0 +1,138 @@
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEVICE_TIMEOUT = 5  # Seconds without advertisement before a device is removed
+RSSI_HISTORY_SIZE = 8  # Last RSSI values kept per device, their mean is the reported RSSI
+LAST_SEEN_RESOLUTION = 1.0  # s between two reports of a device only seen again, with `report_last_seen`
+
+
+class DeviceInfo(NamedTuple):
+    # Immutable view of a device, safe to hand to the Tk thread
+    address: str
+    name: Optional[str]
+    rssi: Optional[int]  # Smoothed
+    last_seen: float
+    advertisement: object  # Latest Advertisement
+
+
+class DeviceChanges(NamedTuple):
+    added: List[DeviceInfo]
+    updated: List[DeviceInfo]
+    removed: List[str]  # Addresses
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+
+class _Device:
+    __slots__ = ("advertisement", "name", "rssi_history", "rssi", "last_seen", "reported_last_seen")
+
+    def __init__(self, rssi_history_size: int):
+        self.advertisement = None
+        self.name = None
+        self.rssi_history = deque(maxlen=rssi_history_size)
+        self.rssi = None
+        self.last_seen = 0.0
+        self.reported_last_seen = 0.0
+
+    def info(self, address: str) -> DeviceInfo:
+        return DeviceInfo(address, self.name, self.rssi, self.last_seen, self.advertisement)
+
+
+class DeviceTable:
+    # Devices seen by the scanner, keyed by address. The scanner thread records the advertisements with `observe`,
+    # the Tk thread asks for the changes since its last call with `collect_changes`. Only the devices added, removed
+    # or whose name or smoothed RSSI changed are reported, and expiry goes through a heap of deadlines, so a refresh
+    # costs time proportional to the changes and not to the number of devices in range. A device only seen again is
+    # not reported unless `report_last_seen` is set (e.g. to sort by last seen), then once per LAST_SEEN_RESOLUTION.
+    def __init__(self, timeout: float = DEVICE_TIMEOUT, rssi_history_size: int = RSSI_HISTORY_SIZE):
+        self._timeout = timeout
+        self._rssi_history_size = rssi_history_size
+        self._devices: Dict[str, _Device] = {}
+        self._expiry: List[Tuple[float, str]] = []  # (deadline, address), one entry per device
+        self._dirty = set()  # Addresses changed since the last `collect_changes`
+        self._published = set()  # Addresses reported as added and not yet as removed
+        self._lock = threading.Lock()
+        self.report_last_seen = False
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._devices
+
+    def observe(self, advertisement, now: float = None):
+        now = time.time() if now is None else now
+        address = advertisement.address.string
+        with self._lock:
+            device = self._devices.get(address)
+            if device is None:
+                device = self._devices[address] = _Device(self._rssi_history_size)
+                heapq.heappush(self._expiry, (now + self._timeout, address))
+                self._dirty.add(address)
+            device.advertisement = advertisement  # Keep the latest one
+            device.last_seen = now
+
+            name = advertisement.complete_name or device.name  # Not every advertisement carries the name
+            if advertisement.rssi is not None:
+                device.rssi_history.append(advertisement.rssi)
+            history = device.rssi_history
+            rssi = round(sum(history) / len(history)) if history else None
+            if name != device.name or rssi != device.rssi or \
+                    (self.report_last_seen and now - device.reported_last_seen >= LAST_SEEN_RESOLUTION):
+                device.name = name
+                device.rssi = rssi
+                device.reported_last_seen = now
+                self._dirty.add(address)
+
+    def get(self, address: str) -> Optional[DeviceInfo]:
+        with self._lock:
+            device = self._devices.get(address)
+            return device.info(address) if device is not None else None
+
+    def snapshot(self) -> Tuple[DeviceInfo, ...]:
+        with self._lock:
+            return tuple(device.info(address) for address, device in self._devices.items())
+
+    def _expire(self, now: float):
+        # The heap is not updated when a device is seen again: a popped deadline is pushed back at its actual value
+        while self._expiry and self._expiry[0][0] <= now:
+            _, address = heapq.heappop(self._expiry)
+            device = self._devices.get(address)
+            if device is None:
+                continue
+            deadline = device.last_seen + self._timeout
+            if deadline > now:
+                heapq.heappush(self._expiry, (deadline, address))
+            else:
+                del self._devices[address]
+                self._dirty.add(address)
+
+    def collect_changes(self, now: float = None) -> DeviceChanges:
+        now = time.time() if now is None else now
+        added, updated, removed = [], [], []
+        with self._lock:
+            self._expire(now)
+            for address in self._dirty:
+                device = self._devices.get(address)
+                if device is None:
+                    if address in self._published:
+                        self._published.discard(address)
+                        removed.append(address)
+                elif address in self._published:
+                    updated.append(device.info(address))
+                else:
+                    self._published.add(address)
+                    added.append(device.info(address))
+            self._dirty.clear()
+        return DeviceChanges(added, updated, removed)
+
+    def clear(self):
+        # Forget every device, the published ones are reported as removed by the next `collect_changes`
+        with self._lock:
+            self._dirty.update(self._devices)
+            self._devices.clear()
+            self._expiry.clear()
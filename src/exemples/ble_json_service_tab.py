@@ -0,0 +1,250 @@
+import json
+
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+
+from src.abstract_service_tab import AbstractServiceTab
+from src.exemples.custom_figure_canvas_tkagg import CustomFigureCanvasTkAgg
+from src.exemples.matplotlib_gauge import Gauge
+from src.ring_buffer import RingBuffer
+
+MAX_DATA_POINTS = 30
+X_WINDOW_STEP = 10  # Samples by which the x-window moves, it is only redrawn completely when it moves
+Y_MARGIN = 0.25  # Room left above and below the data so the y limits rarely have to change
+SENSOR_CHANNELS = ['Proximity', 'Temperature', 'Barometric Pressure', 'Altitude'] + [
+    f'{key} {axis}' for key in ['Magnetic', 'Acceleration', 'Gyro'] for axis in ['x', 'y', 'z']]
+SOUND_MAX = 100
+SOUND_THRESHOLD = 80
+HUMIDITY_MAX = 100
+HUMIDITY_THRESHOLD = 70
+
+
+class ExJSONServiceTab(AbstractServiceTab):
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self._fig = Figure(dpi=100)
+        # self._fig.set_constrained_layout(True)  # Reduce padding and adjust layout
+        self._fig.set_tight_layout(True)  # Reduce padding and adjust layout
+
+        self._initialize_data_storage()
+        self._setup_subplots()
+        self._setup_axes()
+        self._setup_artists()
+
+        # Add the canvas to Tkinter
+        self._canvas = CustomFigureCanvasTkAgg(self._fig, master=self)
+        self._backgrounds = {}
+        self._canvas.mpl_connect('draw_event', self._on_draw)  # Also fired when the canvas is resized
+        self._canvas.draw()
+        self._canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
+        self._update_plot()
+
+    def _initialize_data_storage(self):
+        self._data_count = 0
+        # The x-window is X_WINDOW_STEP samples wider than MAX_DATA_POINTS, keep enough history to fill it
+        self._history = RingBuffer(MAX_DATA_POINTS + X_WINDOW_STEP, ['x'] + SENSOR_CHANNELS)
+
+        self._color_data = {'Red': 0.0, 'Green': 0.0, 'Blue': 0.0, 'Clear': 0.0}
+        self._sound_data = 0
+        self._humidity_data = 0
+
+    def _setup_subplots(self):
+        self._prox_ax = self._fig.add_subplot(7, 2, 1)
+        self._temp_ax = self._fig.add_subplot(7, 2, 2)
+        self._barom_ax = self._fig.add_subplot(7, 2, 3)
+        self._altitude_ax = self._fig.add_subplot(7, 2, 4)
+        self._gauges_ax = self._fig.add_subplot(7, 2, (5, 7))
+        self._color_ax = self._fig.add_subplot(7, 2, (6, 8))
+        self._magnetic_ax = self._fig.add_subplot(7, 1, 5)
+        self._acce_ax = self._fig.add_subplot(7, 1, 6)
+        self._gyro_ax = self._fig.add_subplot(7, 1, 7)
+
+    def _setup_axes(self):
+        self._x_limits = self._get_x_limits()
+
+        for ax, title, ylabel in [
+            (self._prox_ax, "Proximity", "Distance"),
+            (self._temp_ax, "Temperature", "Celsius"),
+            (self._barom_ax, "Barometric Pressure", "hPa"),
+            (self._altitude_ax, "Altitude", "Meters"),
+            (self._magnetic_ax, "Magnetic", "Field Strength"),
+            (self._acce_ax, "Acceleration", "m/s²"),
+            (self._gyro_ax, "Gyro", "Radians/sec"),
+        ]:
+            ax.set_title(title)
+            ax.set_xlim(*self._x_limits)
+            ax.set_ylabel(ylabel)
+            ax.grid(True)
+
+    def _setup_artists(self):
+        # Artists are created once and animated: they are left out of the full redraws and blitted on top of the
+        # cached background of their axes
+        self._lines = {}
+        for ax, channel in [(self._prox_ax, 'Proximity'), (self._temp_ax, 'Temperature'),
+                            (self._barom_ax, 'Barometric Pressure'), (self._altitude_ax, 'Altitude')]:
+            self._lines[ax] = {channel: ax.plot([], [], 'o-', animated=True)[0]}
+
+        for ax, key in [(self._magnetic_ax, 'Magnetic'), (self._acce_ax, 'Acceleration'), (self._gyro_ax, 'Gyro')]:
+            self._lines[ax] = {f'{key} {axis}': ax.plot([], [], 'o-', label=axis, animated=True)[0]
+                               for axis in ['x', 'y', 'z']}
+            ax.legend(loc='upper left')
+
+        self._setup_gauges()
+
+        self._setup_colors()
+
+    def _get_x_limits(self):
+        # The x-window only moves by X_WINDOW_STEP samples at a time, the frames in between are blitted
+        if self._data_count <= MAX_DATA_POINTS:
+            return 0, MAX_DATA_POINTS
+        min_x, max_x = getattr(self, '_x_limits', (0, MAX_DATA_POINTS))
+        if self._data_count + 1 > max_x:
+            min_x = self._data_count - MAX_DATA_POINTS
+            max_x = min_x + MAX_DATA_POINTS + X_WINDOW_STEP
+        return min_x, max_x
+
+    def append_sensor_data(self, data):
+        self._data_count += 1
+        sensors = data['Sensors']
+
+        row = [
+            self._data_count,
+            float(sensors['Proximity']),
+            float(sensors['Temperature'].replace(" C", "")),
+            float(sensors['Barometric_pressure']),
+            float(sensors['Altitude'].replace(" m", "")),
+        ]
+        for key in ['Magnetic', 'Acceleration', 'Gyro']:
+            row.extend(float(sensors[key][axis]) for axis in ['x', 'y', 'z'])
+        self._history.append(row)
+
+        self._sound_data = float(sensors['Sound_level'])
+        self._humidity_data = float(sensors['Humidity'].replace(" %", ""))
+
+        for color in self._color_data:
+            self._color_data[color] = float(sensors['Color'][color])
+
+    def _update_plot(self):
+        changed_axes = self._update_lines() + self._update_gauges() + self._update_colors()
+
+        x_limits = self._get_x_limits()
+        relayout = x_limits != self._x_limits or not self._backgrounds
+        if not relayout:  # Values out of the current y limits also need a full redraw
+            relayout = any([self._fit_y_limits(ax, tight=False) for ax in self._lines])
+
+        if relayout:
+            self._x_limits = x_limits
+            for ax in self._lines:
+                ax.set_xlim(*x_limits)
+                self._fit_y_limits(ax, tight=True)
+            self._canvas.draw()  # The backgrounds are captured again in _on_draw
+        else:
+            self._blit(changed_axes)
+
+    def _update_lines(self):
+        xs = self._history.view('x')
+        for lines in self._lines.values():
+            for channel, line in lines.items():
+                line.set_data(xs, self._history.view(channel))
+        return list(self._lines)
+
+    def _fit_y_limits(self, ax, tight: bool) -> bool:
+        # Returns True when the limits of the axes had to change. Without `tight`, they only grow.
+        if not len(self._history):
+            return False
+        low = min(self._history.view(channel).min() for channel in self._lines[ax])
+        high = max(self._history.view(channel).max() for channel in self._lines[ax])
+        bottom, top = ax.get_ylim()
+        if not tight and bottom <= low and high <= top:
+            return False
+        margin = (high - low) * Y_MARGIN or 1
+        ax.set_ylim(low - margin, high + margin)
+        return True
+
+    def _on_draw(self, event):
+        self._backgrounds = {ax: self._canvas.copy_from_bbox(ax.bbox) for ax in self._animated_axes()}
+        for ax in self._animated_axes():
+            self._draw_animated(ax)
+
+    def _animated_axes(self):
+        return list(self._lines) + [self._gauges_ax, self._color_ax]
+
+    def _draw_animated(self, ax):
+        for artist in ax.get_children():
+            if artist.get_animated() and artist.get_visible():
+                ax.draw_artist(artist)
+
+    def _blit(self, axes):
+        for ax in axes:
+            self._canvas.restore_region(self._backgrounds[ax])
+            self._draw_animated(ax)
+            self._canvas.blit(ax.bbox)
+
+    def _setup_gauges(self):
+        self._sound_gauge = Gauge(self._gauges_ax, center=(1.2, 0), radius=1, title="Sound Level",
+                                  value_range=(0, SOUND_MAX), bar_color='#F46A6A', threshold=SOUND_THRESHOLD,
+                                  suffix=" dB")
+        self._humidity_gauge = Gauge(self._gauges_ax, center=(3.8, 0), radius=1, title="Humidity",
+                                     value_range=(0, HUMIDITY_MAX), bar_color='#34A853', threshold=HUMIDITY_THRESHOLD,
+                                     suffix=" %")
+        self._gauges_ax.set_xlim(0, 5)
+        self._gauges_ax.set_ylim(-0.2, 1.6)
+        self._gauges_ax.set_aspect('equal')
+        self._gauges_ax.axis('off')
+
+    def _update_gauges(self):
+        sound_changed = self._sound_gauge.set_value(self._sound_data)
+        humidity_changed = self._humidity_gauge.set_value(self._humidity_data)
+        return [self._gauges_ax] if sound_changed or humidity_changed else []
+
+    def _setup_colors(self):
+        # Calculate positions to center circles horizontally and vertically
+        num_colors = len(self._color_data)
+        x_positions = np.linspace(1, num_colors * 2 - 1, num_colors)
+        y_position = 1  # Single row, centered vertically
+
+        def get_rgb_color(color_name):
+            return {
+                'Red': (1, 0, 0),
+                'Green': (0, 1, 0),
+                'Blue': (0, 0, 1),
+                'Clear': (0.9, 0.9, 0.9)
+            }.get(color_name, (0, 0, 0))
+
+        self._color_circles = {}
+        self._color_texts = {}
+        for x_pos, color in zip(x_positions, self._color_data):
+            circle = plt.Circle((x_pos, y_position), 0.5, color=get_rgb_color(color), alpha=0, animated=True)
+            self._color_circles[color] = self._color_ax.add_patch(circle)
+            self._color_texts[color] = self._color_ax.text(x_pos, y_position, '', horizontalalignment='center',
+                                                           verticalalignment='center', animated=True)
+        self._color_intensities = None
+
+        # Set limits to center the row of circles
+        self._color_ax.set_xlim(0, num_colors * 2)
+        self._color_ax.set_ylim(0, 2)
+        self._color_ax.set_aspect('equal')
+        self._color_ax.axis('off')
+
+    def _update_colors(self):
+        max_intensity = max(self._color_data.values()) if max(self._color_data.values()) > 0 else 1
+        normalized_color_data = {k: round(v / max_intensity, 2) for k, v in self._color_data.items()}
+        if normalized_color_data == self._color_intensities:  # Nothing changes at the displayed precision
+            return []
+        self._color_intensities = normalized_color_data
+
+        for color, intensity in normalized_color_data.items():
+            self._color_circles[color].set_alpha(intensity)
+            self._color_texts[color].set_text(f'{color}\n{intensity:.2f}')
+        return [self._color_ax]
+
+    def update_data(self, new_data):
+        self.append_sensor_data(json.loads(new_data))
+        self._update_plot()
+
+    def update_data_batch(self, samples):
+        for new_data in samples:
+            self.append_sensor_data(json.loads(new_data))
+        self._update_plot()
@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.exemples.ble_json_service_tab import ExJSONServiceTab
+from src.exemples.ble_packed_service import SENSOR_SCHEMA
+
+# Fields of SENSOR_SCHEMA in the order of the SENSOR_CHANNELS of the JSON tab
+PLOTTED_FIELDS = ['Proximity', 'Temperature', 'Barometric_pressure', 'Altitude'] + [
+    f'{key}.{axis}' for key in ['Magnetic', 'Acceleration', 'Gyro'] for axis in ['x', 'y', 'z']]
+
+
+class ExPackedServiceTab(ExJSONServiceTab):
+    # Same plots as the JSON tab. The records received during a frame are decoded at once through a NumPy view of
+    # their bytes instead of being parsed one by one from text.
+    def update_data(self, new_data):
+        self.update_data_batch([new_data])
+
+    def update_data_batch(self, samples):
+        records = [sample for sample in samples if len(sample) == SENSOR_SCHEMA.size]
+        if len(records) != len(samples):
+            print(f"ExPackedServiceTab: {len(samples) - len(records)} record(s) of an unexpected size ignored")
+        if not records:
+            return
+
+        columns = SENSOR_SCHEMA.unpack_many(b"".join(records))
+        count = len(records)
+        xs = np.arange(self._data_count + 1, self._data_count + count + 1)
+        self._data_count += count
+        self._history.extend(np.column_stack([xs] + [columns[field] for field in PLOTTED_FIELDS]))
+
+        self._sound_data = float(columns['Sound_level'][-1])
+        self._humidity_data = float(columns['Humidity'][-1])
+        for color in self._color_data:
+            self._color_data[color] = float(columns[f'Color.{color}'][-1])
+        self._update_plot()
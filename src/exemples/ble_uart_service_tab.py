@@ -0,0 +1,324 @@
+import math
+
+import customtkinter as ctk
+import numpy as np
+from matplotlib.figure import Figure
+
+from src.abstract_service_tab import AbstractServiceTab, MERGE
+from src.decimation import minmax_decimate
+from src.exemples.custom_figure_canvas_tkagg import CustomFigureCanvasTkAgg
+from src.line_framer import LineFramer
+from src.ring_buffer import RingBuffer
+from src.utils import STD_PADDING, DEFAULT_UI_FPS
+
+MAX_DATA_POINTS = 100_000  # Samples kept by the plotter, memory stays constant once it is full
+DEFAULT_X_RANGE = 100
+TERMINAL_MAX_LINES = 10_000  # Scrollback of the terminal
+TERMINAL_MAX_CHARS = 1_000_000  # Also applies to streams without newlines, such as the hex view
+TERMINAL_TRIM_SLACK = 0.1
+TERMINAL_FLUSH_INTERVAL = 1000 // DEFAULT_UI_FPS  # ms
+TRANSPARENT_COLOR = "transparent"
+
+
+class UARTPlotterTab(ctk.CTkFrame):
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self._fig = Figure(dpi=100)
+        self._fig.set_tight_layout(True)  # Reduce padding and adjust layout
+
+        # Initialize data storage
+        self._history = RingBuffer(MAX_DATA_POINTS, ['y'])
+
+        self._ax = self._fig.add_subplot(111)
+        self._setup_axis()
+        self._line, = self._ax.plot([], [], color='red')
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        # Create a canvas
+        self._canvas = CustomFigureCanvasTkAgg(self._fig, master=self)
+        self._canvas.draw()
+        self._canvas.get_tk_widget().grid(row=0, column=0, columnspan=4, sticky="nsew")
+
+        self._create_buttons()
+        self._create_scale()
+
+        self._plot = True
+        self.stop_plotting()
+
+    def _create_buttons(self):
+        button_frame = ctk.CTkFrame(master=self)
+        button_frame.grid(row=1, column=0, columnspan=4, sticky="ew")
+
+        button_frame.grid_columnconfigure((0, 1, 2), weight=1)
+
+        self.start_button = ctk.CTkButton(master=button_frame, text="Start", command=self.start_plotting)
+        self.start_button.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+        self.stop_button = ctk.CTkButton(master=button_frame, text="Stop", command=self.stop_plotting)
+        self.stop_button.grid(row=0, column=1, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+        self.clear_button = ctk.CTkButton(master=button_frame, text="Clear", command=self.clear_plot)
+        self.clear_button.grid(row=0, column=2, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+    def _create_scale(self):
+        self.scale_frame = ctk.CTkFrame(master=self)
+        self.scale_frame.grid_columnconfigure(0, weight=1)
+        self.scale_frame.grid_columnconfigure(1, weight=2)
+        self.scale_frame.grid_rowconfigure(0, weight=1)
+
+        self.range_label = ctk.CTkLabel(master=self.scale_frame, text=f"X-axis Range: {DEFAULT_X_RANGE}")
+        self.range_label.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+        # Logarithmic scale from 10 samples to the whole history
+        self.range_scale = ctk.CTkSlider(master=self.scale_frame, from_=1, to=math.log10(MAX_DATA_POINTS),
+                                         command=self._set_x_range)
+        self.range_scale.set(math.log10(DEFAULT_X_RANGE))
+        self.range_scale.grid(row=0, column=1, columnspan=3, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+        self.scale_frame.grid(row=2, column=0, columnspan=5, sticky="nsew")
+
+    def _setup_axis(self):
+        # self._ax.set_xlabel('Num')
+        self._ax.set_ylabel('Values')
+        self._ax.grid(True)
+
+    def start_plotting(self):
+        self._plot = True
+        self.start_button.configure(state=ctk.DISABLED)
+        self.stop_button.configure(state=ctk.NORMAL)
+
+    def stop_plotting(self):
+        self._plot = False
+        self.start_button.configure(state=ctk.NORMAL)
+        self.stop_button.configure(state=ctk.DISABLED)
+
+    def _get_x_range(self) -> int:
+        return int(round(10 ** self.range_scale.get()))
+
+    def _set_x_range(self, _value=None):
+        x_range = self._get_x_range()
+        self.range_label.configure(text=f"X-axis Range: {x_range}")
+        self._redraw()
+
+    def clear_plot(self):
+        self._history.clear()
+        self._line.set_data([], [])
+        self._ax.relim()
+        self._canvas.draw()
+
+    def _redraw(self):
+        count = self._history.total
+        if not count:
+            return
+        x_range = self._get_x_range()
+
+        # Only the visible window is decimated, down to about two points per pixel column. The decimated points keep
+        # the extremes of each column, so the y limits of the window are taken from them in one NumPy pass.
+        ys = self._history.view('y')[-x_range:]
+        first_x = count - len(ys)
+        xs = np.arange(first_x, count)
+        xs, ys = minmax_decimate(xs, ys, int(self._ax.bbox.width), first_index=first_x)
+        self._line.set_data(xs, ys)
+
+        # Adjust x-axis range based on the scale value
+        min_x = max(0, count - 1 - x_range) if count > x_range else 0
+        max_x = count if count > x_range else x_range
+        self._ax.set_xlim(left=min_x, right=max_x)
+
+        # Adjust y-axis range based on the data in the window
+        self._ax.set_ylim(bottom=ys.min() - 1, top=ys.max() + 1)
+        self._canvas.draw_idle()
+
+    def update_values(self, values):
+        # `values` are the numbers parsed by the LineFramer of the UARTServiceTab
+        if self._plot and len(values):
+            self._history.extend(values)
+            self._redraw()
+
+
+class UARTTerminalTab(ctk.CTkFrame):
+    PLACE_HOLDER_MSG = "Type in a message to send"
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=0)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=0)
+
+        self.view_mode = 'text'
+        self.terminal_mode = False
+        self.auto_scroll = True
+
+        self._pending = []  # (received bytes or None for a sent message, list of texts) waiting for the next flush
+        self._flush_id = None
+        self._displayed_chars = 0
+
+        self._create_option_widgets()
+        self._create_rx_widgets()
+        self._create_tx_widgets()
+
+    def _create_option_widgets(self):
+        self.options_frame = ctk.CTkFrame(master=self)
+        self.options_frame.grid(row=0, column=0, columnspan=4, sticky="nsew")
+        self.options_frame.grid_rowconfigure(0, weight=1)
+        self.clear_button = ctk.CTkButton(master=self.options_frame, text="Clear", command=self.clear_received)
+        self.clear_button.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsw")
+        self.view_mode_options = ctk.CTkOptionMenu(master=self.options_frame, values=["text", "hex"],
+                                                   command=self.set_view_mode, anchor="center")
+        self.view_mode_options.grid(row=0, column=1, padx=STD_PADDING, pady=STD_PADDING, sticky="nsw")
+        self.terminal_mode_switch = ctk.CTkSwitch(master=self.options_frame, text="Terminal Mode",
+                                                  command=self.toggle_terminal_mode)
+        self.terminal_mode_switch.grid(row=0, column=2, padx=STD_PADDING, pady=STD_PADDING, sticky="nsw")
+        self.auto_scroll_switch = ctk.CTkSwitch(master=self.options_frame, text="Auto Scroll",
+                                                command=self.toggle_auto_scroll)
+        self.auto_scroll_switch.grid(row=0, column=3, padx=STD_PADDING, pady=STD_PADDING, sticky="nsw")
+        # Set initial state of switches
+        if self.terminal_mode:
+            self.terminal_mode_switch.select()
+        else:
+            self.terminal_mode_switch.deselect()
+        if self.auto_scroll:
+            self.auto_scroll_switch.select()
+        else:
+            self.auto_scroll_switch.deselect()
+
+    def _create_rx_widgets(self):
+        self.receiving_frame = ctk.CTkFrame(master=self)
+        self.receiving_frame.grid(row=1, column=0, columnspan=4, sticky="nsew")
+        self.receiving_frame.grid_columnconfigure(0, weight=1)
+        self.receiving_frame.grid_rowconfigure(0, weight=0)
+        self.receiving_frame.grid_rowconfigure(1, weight=1)
+        self.data_label = ctk.CTkLabel(master=self.receiving_frame, text="Received Data:")
+        self.data_label.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
+        self.data_display = ctk.CTkTextbox(master=self.receiving_frame, wrap="word", state="disabled")
+        self.data_display.grid(row=1, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+    def _create_tx_widgets(self):
+        self.sending_frame = ctk.CTkFrame(master=self)
+        self.sending_frame.grid(row=2, column=0, columnspan=4, sticky="nsew")
+        self.sending_frame.grid_columnconfigure(0, weight=0)
+        self.sending_frame.grid_columnconfigure(1, weight=1)
+        self.sending_frame.grid_rowconfigure(0, weight=1)
+        self.data_entry = ctk.CTkEntry(master=self.sending_frame, placeholder_text=self.PLACE_HOLDER_MSG)
+        self.data_entry.grid(row=0, column=0, columnspan=3, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+        self.send_button = ctk.CTkButton(master=self.sending_frame, text="Send", command=self.send_data)
+        self.send_button.grid(row=0, column=3, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
+
+    def send_data(self):
+        sending_msg = self.data_entry.get()
+        # TODO: Implement sending data via UART
+        self._append(None, f"Sent: {sending_msg}\n")
+        self.data_entry.delete(0, ctk.END)
+        self.data_entry.insert(0, self.PLACE_HOLDER_MSG)
+
+    def clear_received(self):
+        self._pending.clear()
+        self._displayed_chars = 0
+        self.data_display.configure(state="normal")
+        self.data_display.delete(1.0, ctk.END)
+        self.data_display.configure(state="disabled")
+
+    def set_view_mode(self, mode):
+        self.view_mode = mode
+
+    def toggle_terminal_mode(self):
+        self.terminal_mode = self.terminal_mode_switch.get()
+        # TODO: Implement terminal mode toggle logic
+
+    def toggle_auto_scroll(self):
+        self.auto_scroll = self.auto_scroll_switch.get()
+
+    def destroy(self):
+        if self._flush_id is not None:
+            self.after_cancel(self._flush_id)
+            self._flush_id = None
+        super().destroy()
+
+    def update_data(self, data, text):
+        # `text` is `data` already decoded by the LineFramer of the UARTServiceTab
+        self._append(data, text)
+
+    def _append(self, data, text):
+        # Consecutive received payloads are merged into a single pending entry, sent messages (data is None) are kept
+        # apart. Everything pending is inserted at once on the next flush.
+        if data is not None and self._pending and self._pending[-1][0] is not None:
+            self._pending[-1][0].extend(data)
+            self._pending[-1][1].append(text)
+        else:
+            self._pending.append((bytearray(data) if data is not None else None, [text]))
+
+        if self._flush_id is None:
+            self._flush_id = self.after(TERMINAL_FLUSH_INTERVAL, self._flush)
+
+    def _flush(self):
+        self._flush_id = None
+        if not self._pending:
+            return
+        if self.view_mode == 'hex':
+            chunks = [data.hex() if data is not None else "".join(texts) for data, texts in self._pending]
+        else:
+            chunks = ["".join(texts) for _, texts in self._pending]
+        self._pending.clear()
+        new_text = "".join(chunks)
+
+        self.data_display.configure(state="normal")
+        self.data_display.insert(ctk.END, text=new_text)
+        self._displayed_chars += len(new_text)
+        self._trim_scrollback()
+        self.data_display.configure(state="disabled")
+
+        if self.auto_scroll:
+            self.data_display.see(ctk.END)
+
+    def _trim_scrollback(self):
+        # Old content is removed in bulk once the caps are exceeded by TERMINAL_TRIM_SLACK, not on every insert
+        lines = int(self.data_display.index("end-1c").split(".")[0])
+        if lines > TERMINAL_MAX_LINES * (1 + TERMINAL_TRIM_SLACK):
+            cut = f"{lines - TERMINAL_MAX_LINES + 1}.0"
+            self._displayed_chars -= len(self.data_display.get("1.0", cut))
+            self.data_display.delete("1.0", cut)
+        if self._displayed_chars > TERMINAL_MAX_CHARS * (1 + TERMINAL_TRIM_SLACK):
+            excess = self._displayed_chars - TERMINAL_MAX_CHARS
+            self.data_display.delete("1.0", f"1.0 + {excess} chars")
+            self._displayed_chars -= excess
+
+
+class UARTServiceTab(AbstractServiceTab):
+    backpressure_policy = MERGE  # Chunks of a stream are concatenated rather than dropped
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, bg_color="transparent", **kwargs)
+
+        # create tabview
+        self.tabview = ctk.CTkTabview(master=self, fg_color="transparent")
+        self.tabview.add("Terminal")
+        self.tabview.add("Plotter")
+        self.tabview.tab("Terminal").grid_columnconfigure(0, weight=1)
+        self.tabview.tab("Terminal").grid_rowconfigure(0, weight=1)
+        self.tabview.tab("Plotter").grid_columnconfigure(0, weight=1)
+        self.tabview.tab("Plotter").grid_rowconfigure(0, weight=1)
+        self.tabview.grid(row=0, column=0, sticky="nsew")
+
+        self.terminal = UARTTerminalTab(master=self.tabview.tab("Terminal"))
+        self.terminal.grid(row=0, column=0, sticky="nsew")
+        self.plotter = UARTPlotterTab(master=self.tabview.tab("Plotter"))
+        self.plotter.grid(row=0, column=0, sticky="nsew")
+
+        self._framer = LineFramer()
+
+    def update_data(self, data):
+        # Each payload is framed and decoded once, then shared by the terminal and the plotter
+        chunk = self._framer.feed(data)
+        self.terminal.update_data(data, chunk.text)
+        self.plotter.update_values(chunk.values)
+
+    def update_data_batch(self, samples):
+        self.update_data(b"".join(samples))
+
+    def merge_samples(self, samples):
+        return [b"".join(samples)]
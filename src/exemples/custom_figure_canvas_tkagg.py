@@ -1,7 +1,21 @@
+import time
+
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from src.metrics import CANVAS_DRAW_SECONDS
+
 
 class CustomFigureCanvasTkAgg(FigureCanvasTkAgg):
+    def __init__(self, figure=None, master=None):
+        super().__init__(figure, master=master)
+        self._draw_seconds = CANVAS_DRAW_SECONDS.labels(tab=type(master).__name__)
+
+    def draw(self):
+        # Full redraws, also the ones requested by draw_idle, are timed. Blitting is not.
+        start = time.perf_counter()
+        super().draw()
+        self._draw_seconds.observe(time.perf_counter() - start)
+
     def winfo_exists(self):
         # This method should return whether the Tkinter widget exists.
         try:
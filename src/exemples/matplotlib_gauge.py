@@ -0,0 +1,58 @@
+import math
+
+from matplotlib.lines import Line2D
+from matplotlib.patches import Wedge
+
+BACKGROUND_COLOR = "#E5ECF6"
+THRESHOLD_COLOR = "red"
+
+
+class Gauge:
+    # Half-circle gauge drawn with matplotlib artists. The arc, ticks, threshold and title are drawn once with the
+    # axes, only the value bar and the value text are animated so an update can be blitted.
+    def __init__(self, ax, center, radius, title, value_range=(0, 100), bar_color="#3B8ED0", threshold=None,
+                 suffix="", fmt="{:.1f}", fontsize=12):
+        self._min, self._max = value_range
+        self._suffix = suffix
+        self._fmt = fmt
+        x, y = center
+        width = radius * 0.35
+
+        ax.add_patch(Wedge(center, radius, 0, 180, width=width, facecolor=BACKGROUND_COLOR, edgecolor="none"))
+        self._bar = ax.add_patch(Wedge(center, radius * 0.95, 180, 180, width=width * 0.8, facecolor=bar_color,
+                                       edgecolor="none", animated=True))
+
+        if threshold is not None:
+            direction = self._direction(threshold)
+            inner, outer = radius - width * 1.1, radius * 1.02
+            ax.add_line(Line2D([x + inner * direction[0], x + outer * direction[0]],
+                               [y + inner * direction[1], y + outer * direction[1]],
+                               color=THRESHOLD_COLOR, linewidth=3))
+
+        for tick in (self._min, (self._min + self._max) / 2, self._max):
+            direction = self._direction(tick)
+            ax.text(x + radius * 1.12 * direction[0], y + radius * 1.12 * direction[1], f"{tick:g}",
+                    horizontalalignment="center", verticalalignment="center", fontsize=fontsize * 0.7)
+
+        ax.text(x, y + radius * 1.35, title, horizontalalignment="center", verticalalignment="center",
+                fontsize=fontsize)
+        self._value_text = ax.text(x, y + radius * 0.1, "", horizontalalignment="center",
+                                   verticalalignment="bottom", fontsize=fontsize * 1.4, animated=True)
+        self._displayed = None
+
+    def _fraction(self, value):
+        return min(max((value - self._min) / (self._max - self._min), 0.0), 1.0)
+
+    def _direction(self, value):
+        angle = math.pi * (1 - self._fraction(value))
+        return math.cos(angle), math.sin(angle)
+
+    def set_value(self, value) -> bool:
+        # Returns True when the displayed gauge changed and has to be redrawn
+        text = self._fmt.format(value) + self._suffix
+        if text == self._displayed:
+            return False
+        self._displayed = text
+        self._bar.set_theta1(180 * (1 - self._fraction(value)))
+        self._value_text.set_text(text)
+        return True
@@ -0,0 +1,51 @@
+import codecs
+import re
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from src.line_splitter import LineSplitter
+
+FLOAT_PATTERN = re.compile(rb'^[+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+
+
+class FramedChunk(NamedTuple):
+    text: str  # The payload decoded once, for display
+    values: np.ndarray  # Numbers parsed from the lines completed by this payload
+    rejected: int  # Completed lines that were not numbers
+
+
+def parse_float_lines(lines: List[bytes]) -> Tuple[np.ndarray, int]:
+    # Validate each line with the compiled pattern, then convert all the valid ones at once
+    stripped = [line.strip() for line in lines]
+    valid = [line for line in stripped if FLOAT_PATTERN.match(line)]
+    rejected = sum(1 for line in stripped if line) - len(valid)
+    if not valid:
+        return np.empty(0), rejected
+    return np.array(valid).astype(np.float64), rejected
+
+
+class LineFramer:
+    # Turns a stream of payloads into numbers, one per complete line. A number split across two BLE packets is parsed
+    # once it is complete, a carry-over dropped by the LineSplitter is counted as rejected.
+    def __init__(self):
+        self._splitter = LineSplitter()
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.parsed_lines = 0
+        self.rejected_lines = 0
+
+    def feed(self, data: bytes) -> FramedChunk:
+        text = self._decoder.decode(data)
+        lines, dropped = self._splitter.split(data)
+        if not lines:
+            self.rejected_lines += dropped
+            return FramedChunk(text, np.empty(0), dropped)
+
+        values, rejected = parse_float_lines(lines)
+        self.parsed_lines += len(values)
+        self.rejected_lines += rejected
+        return FramedChunk(text, values, rejected)
+
+    def reset(self):
+        self._splitter.reset()
+        self._decoder.reset()
@@ -0,0 +1,30 @@
+from typing import List, Tuple
+
+MAX_LINE_LENGTH = 4096  # A carry-over that grows past this without a newline is dropped and counted
+
+
+class LineSplitter:
+    # Turns a stream of payloads into complete lines. The bytes after the last newline are kept until the next
+    # payload, so a line split across two BLE packets is returned once it is complete. Shared by the LineFramer of
+    # the UART tab and `UARTService.decode`, so the GUI and the command line frame a stream the same way.
+    def __init__(self):
+        self._carry = bytearray()
+        self.dropped_lines = 0
+
+    def split(self, data: bytes) -> Tuple[List[bytes], int]:
+        # The lines completed by `data` without their newline, and 1 when the carry-over overflowed and was dropped
+        self._carry += data
+        end = self._carry.rfind(b'\n')
+        if end < 0:
+            if len(self._carry) > MAX_LINE_LENGTH:
+                self._carry.clear()
+                self.dropped_lines += 1
+                return [], 1
+            return [], 0
+
+        lines = bytes(self._carry[:end]).split(b'\n')
+        del self._carry[:end + 1]
+        return lines, 0
+
+    def reset(self):
+        self._carry.clear()
@@ -1,7 +1,13 @@
-import customtkinter as ctk
-
-from src.connection_tab import ConnectionTab
-from src.service_tabs import ServiceTabs
+from src import startup_timing  # First, the startup times are counted from its import
+
+with startup_timing.timed("import customtkinter"):
+    import customtkinter as ctk
+with startup_timing.timed("import src.connection_tab"):
+    from src.connection_tab import ConnectionTab
+with startup_timing.timed("import src.service_tabs"):
+    from src.service_tabs import ServiceTabs
+from src.metrics import start_http_server_from_env
+from src.profiling import dump_on_exit, enable_from_env
 from src.utils import STD_PADDING, DEFAULT_APPEARANCE_MODE, DEFAULT_COLOR_THEME
 
 
@@ -17,21 +23,27 @@ class BLEToolkitApp(ctk.CTk):
         self.grid_columnconfigure(1, weight=10)
         self.grid_rowconfigure(0, weight=1)
 
-        self.service_tabs = ServiceTabs(master=self)
+        self.metrics_server = start_http_server_from_env()  # With PYBLETOOLKIT_METRICS_PORT
+        self.service_tabs = ServiceTabs(master=self, metrics_server=self.metrics_server)
         self.service_tabs.grid_columnconfigure(0, weight=1)
         self.service_tabs.grid_rowconfigure(0, weight=1)
         self.service_tabs.grid(row=0, column=1, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
 
         self.connection_tab = ConnectionTab(master=self,
+                                            service_discover_command=self.service_tabs.discover_services,
                                             service_connect_command=self.service_tabs.connect,
-                                            service_disconnect_command=self.service_tabs.disconnect)
+                                            service_disconnect_command=self.service_tabs.disconnect,
+                                            device_info_command=self.service_tabs.update_device_info)
         self.connection_tab.grid_columnconfigure(0, weight=1)
         self.connection_tab.grid_rowconfigure(0, weight=1)
         self.connection_tab.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
 
     def closing_handler(self):
-        self.service_tabs.disconnect()
+        self.service_tabs.quit_()
         self.connection_tab.quit_()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        dump_on_exit()
         self.quit()
 
 
@@ -41,6 +53,9 @@ def initialize_app_settings():
 
 
 if __name__ == '__main__':
+    enable_from_env()  # With PYBLETOOLKIT_PROFILE
     initialize_app_settings()
-    app = BLEToolkitApp()
+    with startup_timing.timed("window creation"):
+        app = BLEToolkitApp()
+    app.after_idle(startup_timing.mark, "first frame")
     app.mainloop()
@@ -0,0 +1,310 @@
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Counters, gauges and histograms of the ingest and render pipeline. The stats panel shows them and
+# `start_http_server` serves them in the Prometheus text format, e.g. to watch a gateway remotely:
+#   PYBLETOOLKIT_METRICS_PORT=9464 python -m src.main
+#   curl http://127.0.0.1:9464/metrics
+METRICS_PORT_ENV_VAR = "PYBLETOOLKIT_METRICS_PORT"
+METRICS_HOST = "127.0.0.1"  # Only local clients by default
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # s
+SIZE_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 16384)  # bytes
+
+
+class CounterValue:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class GaugeValue:
+    __slots__ = ("_value",)
+
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value  # A single assignment, no lock needed
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class HistogramValue:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # The last one counts the values above every bound
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        # Count of each bucket (not cumulative) and sum of the values
+        with self._lock:
+            return list(self._counts), self._sum
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-quantile, None without values or when it is above every bound
+        counts, _ = self.snapshot()
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulated = 0
+        for bound, count in zip(self._bounds, counts):
+            cumulated += count
+            if cumulated >= rank:
+                return bound
+        return None
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        # The value of one combination of labels, keep it rather than looking it up for every update
+        key = tuple(str(labels.get(name) or "") for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, **labels):
+        key = tuple(str(labels.get(name) or "") for name in self.label_names)
+        with self._lock:
+            self._children.pop(key, None)
+
+    def children(self) -> List[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.label_names, key)), child) for key, child in items]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_type, name: str, *args, **kwargs):
+        # A name registered again returns the existing metric
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, *args, **kwargs)
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"The metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, label_names)
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def exposition(self) -> str:
+        # Prometheus text format 0.0.4
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for labels, child in metric.children():
+                if isinstance(child, HistogramValue):
+                    counts, total = child.snapshot()
+                    cumulated = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                        cumulated += count
+                        lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} "
+                                     f"{cumulated}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {cumulated}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Metrics of the pipeline. The services are labelled with their class name and the address of their device.
+SERVICE_READ_SECONDS = REGISTRY.histogram("pybletoolkit_service_read_seconds", "Duration of the polled reads",
+                                          ("service", "device"))
+SERVICE_READ_ERRORS = REGISTRY.counter("pybletoolkit_service_read_errors_total", "Polled reads that failed",
+                                       ("service", "device"))
+SERVICE_SAMPLES = REGISTRY.counter("pybletoolkit_service_samples_total", "Payloads received",
+                                   ("service", "device"))
+SERVICE_PAYLOAD_BYTES = REGISTRY.histogram("pybletoolkit_service_payload_bytes",
+                                           "Size of the payloads received as bytes or text",
+                                           ("service", "device"), SIZE_BUCKETS)
+UI_QUEUE_DEPTH = REGISTRY.gauge("pybletoolkit_ui_queue_depth", "Samples waiting for the next frame",
+                                ("tab", "device"))
+UI_DROPPED_SAMPLES = REGISTRY.counter("pybletoolkit_ui_dropped_samples_total",
+                                      "Samples dropped by the backpressure policy", ("tab", "device"))
+TAB_UPDATE_SECONDS = REGISTRY.histogram("pybletoolkit_tab_update_seconds", "Duration of update_data_batch",
+                                        ("tab", "device"))
+CANVAS_DRAW_SECONDS = REGISTRY.histogram("pybletoolkit_canvas_draw_seconds", "Duration of the full canvas redraws",
+                                         ("tab",))
+SCANNER_ADVERTISEMENTS = REGISTRY.counter("pybletoolkit_scanner_advertisements_total", "Advertisements received")
+SCANNER_DEVICES = REGISTRY.gauge("pybletoolkit_scanner_devices", "Devices in the device table")
+
+
+def payload_size(data) -> Optional[int]:
+    # Size of a raw payload, None for the ones already decoded (e.g. the dict of a JSON characteristic)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    if isinstance(data, str):
+        return len(data)  # Characters, as many as bytes for ASCII
+    return None
+
+
+class PayloadMetrics:
+    # Samples and payload sizes of one service of one device
+    __slots__ = ("_samples", "_sizes")
+
+    def __init__(self, service: str, device: Optional[str]):
+        self._samples = SERVICE_SAMPLES.labels(service=service, device=device)
+        self._sizes = SERVICE_PAYLOAD_BYTES.labels(service=service, device=device)
+
+    def observe(self, data):
+        self._samples.inc()
+        size = payload_size(data)
+        if size is not None:
+            self._sizes.observe(size)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = self.server.registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # No line per scrape
+
+
+def start_http_server(port: int, host: str = METRICS_HOST, registry: MetricsRegistry = REGISTRY) \
+        -> ThreadingHTTPServer:
+    # Serves `registry` on http://host:port/metrics from a daemon thread, `shutdown()` the returned server to stop
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def metrics_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{METRICS_PATH}"
+
+
+def start_http_server_from_env() -> Optional[ThreadingHTTPServer]:
+    # Started when PYBLETOOLKIT_METRICS_PORT is set, None otherwise or when the port cannot be used
+    port = os.environ.get(METRICS_PORT_ENV_VAR, "")
+    if not port:
+        return None
+    try:
+        return start_http_server(int(port))
+    except (OSError, ValueError) as e:
+        print(f"Metrics: Cannot serve the metrics on port {port}: {e}")
+        return None
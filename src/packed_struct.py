@@ -0,0 +1,134 @@
+import struct
+from typing import Dict, Mapping, NamedTuple, Optional, Sequence, Union
+
+from adafruit_ble.attributes import Attribute
+from adafruit_ble.characteristics import Characteristic
+
+# Fixed-layout little-endian records described by a schema: an optional sequence number (uint16, wraps around), an
+# optional timestamp (uint32, ms on the device clock) and the fields in order, each a struct format code with a scale
+# turning the stored integer into its value (e.g. "h" with scale 0.01 for a temperature in hundredths of a degree).
+SEQUENCE_FIELD = "sequence"
+TIMESTAMP_FIELD = "timestamp"
+SEQUENCE_FORMAT = "H"
+TIMESTAMP_FORMAT = "I"
+# Struct format codes allowed in a schema and their NumPy equivalents
+NUMPY_FORMATS = {"b": "i1", "B": "u1", "h": "i2", "H": "u2", "i": "i4", "I": "u4", "q": "i8", "Q": "u8",
+                 "e": "f2", "f": "f4", "d": "f8"}
+_FLOAT_FORMATS = "efd"
+
+
+class PackedField(NamedTuple):
+    name: str
+    format: str  # One of NUMPY_FORMATS
+    scale: float = 1.0  # Value = stored number * scale
+
+
+class _Scale(NamedTuple):
+    # Scales like 0.01 are applied as a division, 1234 / 100 gives 12.34 where 1234 * 0.01 gives 12.340000000000002
+    factor: float
+    divisor: int
+
+    @classmethod
+    def of(cls, scale: float) -> "_Scale":
+        divisor = round(1.0 / scale) if scale else 0
+        if divisor > 1 and abs(divisor * scale - 1.0) < 1e-9:
+            return cls(1.0, divisor)
+        return cls(scale, 1)
+
+    def apply(self, number):
+        return number / self.divisor if self.divisor != 1 else number * self.factor
+
+
+class PackedSchema:
+    def __init__(self, fields: Sequence[PackedField], sequence: bool = False, timestamp: bool = False):
+        header = ([PackedField(SEQUENCE_FIELD, SEQUENCE_FORMAT)] if sequence else []) + \
+                 ([PackedField(TIMESTAMP_FIELD, TIMESTAMP_FORMAT)] if timestamp else [])
+        self._header = tuple(field.name for field in header)
+        self._fields = tuple(header) + tuple(PackedField(*field) for field in fields)
+        names = [field.name for field in self._fields]
+        if len(set(names)) != len(names):
+            raise ValueError("The names of the fields of a packed schema must be unique")
+        for field in self._fields:
+            if field.format not in NUMPY_FORMATS:
+                raise ValueError(f"Unsupported format {field.format!r} for {field.name}, "
+                                 f"expected one of {''.join(NUMPY_FORMATS)}")
+        self._struct = struct.Struct("<" + "".join(field.format for field in self._fields))
+        self._names = tuple(names)
+        self._scales = tuple(_Scale.of(field.scale) if field.scale != 1.0 else None for field in self._fields)
+        self._scaled = any(scale is not None for scale in self._scales)
+        self._dtype = None
+
+    @property
+    def fields(self):
+        return self._fields
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def size(self) -> int:
+        # Bytes of one record
+        return self._struct.size
+
+    @property
+    def dtype(self):
+        # NumPy structured dtype with the same layout, numpy is only imported when it is first needed
+        if self._dtype is None:
+            import numpy as np
+            self._dtype = np.dtype([(field.name, "<" + NUMPY_FORMATS[field.format]) for field in self._fields])
+        return self._dtype
+
+    def pack(self, values: Mapping[str, float], sequence: int = 0, timestamp: int = 0) -> bytes:
+        # The header fields are taken from the arguments, wrapped to their size
+        numbers = [{SEQUENCE_FIELD: sequence & 0xFFFF, TIMESTAMP_FIELD: timestamp & 0xFFFFFFFF}[name]
+                   for name in self._header]
+        for field in self._fields[len(self._header):]:
+            number = values[field.name] / field.scale
+            numbers.append(number if field.format in _FLOAT_FORMATS else round(number))
+        return self._struct.pack(*numbers)
+
+    def unpack(self, data: Union[bytes, bytearray, memoryview]) -> Dict[str, float]:
+        # One record, with its header fields
+        if len(data) < self._struct.size:
+            raise ValueError(f"Packed record of {len(data)} bytes, expected {self._struct.size}")
+        numbers = self._struct.unpack_from(data)
+        if not self._scaled:
+            return dict(zip(self._names, numbers))
+        return {name: scale.apply(number) if scale is not None else number
+                for name, number, scale in zip(self._names, numbers, self._scales)}
+
+    def unpack_many(self, data: Union[bytes, bytearray, memoryview]) -> Dict:
+        # Column of each field over consecutive records, decoded at once through a NumPy view of the bytes. The
+        # unscaled columns are read-only views of `data`, the scaled ones are float64 arrays.
+        if len(data) % self._struct.size:
+            raise ValueError(f"{len(data)} bytes is not a whole number of {self._struct.size} byte records")
+        import numpy as np
+        records = np.frombuffer(data, dtype=self.dtype)
+        return {name: scale.apply(records[name]) if scale is not None else records[name]
+                for name, scale in zip(self._names, self._scales)}
+
+
+class PackedStructCharacteristic(Characteristic):
+    # Characteristic holding one record of `schema`. Reading gives the raw bytes, so payloads stay compact in the
+    # session logs and are decoded with `schema.unpack` or, by batch, `schema.unpack_many`. A mapping of field values
+    # can be written (e.g. by a peripheral), its header fields are then zero.
+    def __init__(self, schema: PackedSchema, *, uuid=None, properties: int = 0, read_perm: int = Attribute.OPEN,
+                 write_perm: int = Attribute.OPEN, initial_value: Optional[Mapping[str, float]] = None):
+        self.schema = schema
+        super().__init__(uuid=uuid, properties=properties, read_perm=read_perm, write_perm=write_perm,
+                         max_length=schema.size, fixed_length=True,
+                         initial_value=schema.pack(initial_value) if initial_value is not None else None)
+
+    def __get__(self, obj, cls=None):
+        if obj is None:
+            return self
+        raw_data = super().__get__(obj, cls)
+        if raw_data is None or len(raw_data) < self.schema.size:
+            return None
+        return bytes(raw_data)
+
+    def __set__(self, obj, value):
+        if isinstance(value, Mapping):
+            value = self.schema.pack(value)
+        super().__set__(obj, value)
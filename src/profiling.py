@@ -0,0 +1,278 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Opt-in profiling of the service reads and the tab updates of the registered plugins. The methods are only wrapped
+# while a mode is on, so the hooks cost nothing otherwise. Modes, from the stats panel or at startup with
+# PYBLETOOLKIT_PROFILE=timing,sampling,memory (or "all"):
+#   timing: calls, total, mean and max duration of each hooked method
+#   sampling: stacks of the threads running a hooked method, every SAMPLE_INTERVAL, in the folded format of
+#             flamegraph.pl and speedscope
+#   memory: tracemalloc snapshots, the lines that allocated the most and the growth since the previous dump
+# `dump` writes the results to PROFILE_DIR, they are also dumped on exit while a mode is on.
+PROFILE_ENV_VAR = "PYBLETOOLKIT_PROFILE"
+TIMING = "timing"
+SAMPLING = "sampling"
+MEMORY = "memory"
+PROFILE_MODES = (TIMING, SAMPLING, MEMORY)
+PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005  # s between two stack samples
+TRACEMALLOC_FRAMES = 10  # Frames kept per allocation
+MEMORY_TOP_LINES = 30  # Lines listed in a memory dump
+SERVICE_HOOKS = ("read",)
+TAB_HOOKS = ("update_data", "update_data_batch")
+
+
+class _CallTiming:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    def __init__(self):
+        self._modes = set()
+        self._classes: Dict[type, Tuple[str, ...]] = {}  # Registered plugin classes with their hooked methods
+        self._patched: Dict[Tuple[type, str], Optional[object]] = {}  # Original attribute, None when inherited
+        self._current: Dict[int, str] = {}  # Hooked method each thread is running
+        self._timings: Dict[str, _CallTiming] = {}
+        self._samples: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        self._memory_snapshot = None  # Of the previous dump
+        self._lock = threading.RLock()
+
+    @property
+    def modes(self) -> Tuple[str, ...]:
+        return tuple(mode for mode in PROFILE_MODES if mode in self._modes)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._modes)
+
+    def register(self, cls: type, method_names: Iterable[str]):
+        # Called by the service register for each plugin class it loads, hooked right away while a mode is on
+        with self._lock:
+            self._classes[cls] = tuple(method_names)
+            if self._modes:
+                self._hook_class(cls, self._classes[cls])
+
+    def set_mode(self, mode: str, enabled: bool):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {', '.join(PROFILE_MODES)}")
+        sampler = None
+        with self._lock:
+            if enabled == (mode in self._modes):
+                return
+            was_active = self.active
+            if enabled:
+                self._modes.add(mode)
+            else:
+                self._modes.discard(mode)
+
+            if mode == SAMPLING:
+                if enabled:
+                    self._start_sampler()
+                else:
+                    sampler, self._sampler = self._sampler, None
+                    self._sampler_stop.set()
+            elif mode == MEMORY:
+                self._start_tracemalloc() if enabled else self._stop_tracemalloc()
+            if self.active and not was_active:
+                for cls, method_names in self._classes.items():
+                    self._hook_class(cls, method_names)
+            elif was_active and not self.active:
+                self._unhook_all()
+        if sampler is not None and sampler is not threading.current_thread():
+            sampler.join()  # Outside of the lock, the sampler takes it
+
+    def set_modes(self, modes: Iterable[str]):
+        modes = set(modes)
+        for mode in PROFILE_MODES:
+            self.set_mode(mode, mode in modes)
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._samples.clear()
+            self._memory_snapshot = None
+
+    # Hooks
+
+    def _hook_class(self, cls: type, method_names: Iterable[str]):
+        # A method the plugin class inherits (e.g. UARTService.read) is hooked on the plugin class, and subclasses
+        # overriding a method (e.g. the simulated services) are hooked too
+        for klass in [cls] + _subclasses(cls):
+            for name in method_names:
+                if (klass, name) in self._patched or (klass is not cls and name not in klass.__dict__):
+                    continue
+                function = inspect.getattr_static(klass, name, None)
+                if not isinstance(function, types.FunctionType):
+                    continue
+                self._patched[(klass, name)] = function if name in klass.__dict__ else None
+                setattr(klass, name, self._hooked(function, f"{klass.__name__}.{name}"))
+
+    def _unhook_all(self):
+        for (klass, name), function in self._patched.items():
+            if function is None:
+                delattr(klass, name)
+            else:
+                setattr(klass, name, function)
+        self._patched.clear()
+        self._current.clear()
+
+    def _hooked(self, function, label: str):
+        @functools.wraps(function)
+        def hooked(*args, **kwargs):
+            return self._call(label, function, args, kwargs)
+
+        return hooked
+
+    def _call(self, label: str, function, args, kwargs):
+        thread_id = threading.get_ident()
+        outer = self._current.get(thread_id)
+        self._current[thread_id] = label
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if outer is None:
+                self._current.pop(thread_id, None)
+            else:
+                self._current[thread_id] = outer
+            if TIMING in self._modes:
+                with self._lock:
+                    timing = self._timings.get(label)
+                    if timing is None:
+                        timing = self._timings[label] = _CallTiming()
+                    timing.calls += 1
+                    timing.total += elapsed
+                    timing.max = max(timing.max, elapsed)
+
+    # Sampling
+
+    def _start_sampler(self):
+        self._sampler_stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, args=(self._sampler_stop,), daemon=True)
+        self._sampler.start()
+
+    def _sample(self, stop: threading.Event):
+        call_code = Profiler._call.__code__
+        while not stop.wait(SAMPLE_INTERVAL):
+            frames = sys._current_frames()
+            for thread_id, label in list(self._current.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and frame.f_code is not call_code:  # Only what runs inside the hook
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(label)
+                    with self._lock:
+                        self._samples[";".join(reversed(stack))] += 1
+
+    # Memory
+
+    def _start_tracemalloc(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def _stop_tracemalloc(self):
+        import tracemalloc
+        tracemalloc.stop()
+        self._memory_snapshot = None
+
+    # Dumps
+
+    def dump(self, directory: str = PROFILE_DIR) -> List[str]:
+        # Writes the results of the active modes, returns the paths of the files
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        with self._lock:
+            timings = {label: (timing.calls, timing.total, timing.max) for label, timing in self._timings.items()}
+            samples = dict(self._samples)
+        if TIMING in self._modes or timings:
+            paths.append(self._write(directory, f"timing-{stamp}.txt", _format_timings(timings)))
+        if SAMPLING in self._modes or samples:
+            paths.append(self._write(directory, f"samples-{stamp}.folded",
+                                     [f"{stack} {count}" for stack, count in sorted(samples.items())]))
+        if MEMORY in self._modes:
+            paths.append(self._write(directory, f"memory-{stamp}.txt", self._memory_lines()))
+        return paths
+
+    @staticmethod
+    def _write(directory: str, name: str, lines: List[str]) -> str:
+        path = os.path.join(directory, name)
+        with open(path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        return path
+
+    def _memory_lines(self) -> List[str]:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return ["tracemalloc is not tracing"]
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", "",
+                 f"Top {MEMORY_TOP_LINES} lines"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:MEMORY_TOP_LINES]]
+        if self._memory_snapshot is not None:
+            lines += ["", f"Top {MEMORY_TOP_LINES} differences since the previous dump"]
+            lines += [str(stat) for stat in snapshot.compare_to(self._memory_snapshot, "lineno")[:MEMORY_TOP_LINES]]
+        self._memory_snapshot = snapshot
+        return lines
+
+
+def _subclasses(cls: type) -> List[type]:
+    subclasses = []
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_subclasses(subclass))
+    return subclasses
+
+
+def _format_timings(timings: Dict[str, Tuple[int, float, float]]) -> List[str]:
+    lines = [f"{'method':<50} {'calls':>10} {'total ms':>12} {'mean ms':>10} {'max ms':>10}"]
+    for label, (calls, total, longest) in sorted(timings.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{label:<50} {calls:>10} {total * 1000:>12.2f} {total * 1000 / calls:>10.3f} "
+                     f"{longest * 1000:>10.3f}")
+    return lines
+
+
+PROFILER = Profiler()
+
+
+def enable_from_env():
+    # Modes of PYBLETOOLKIT_PROFILE, an unknown mode is reported and ignored
+    value = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+    if not value or value == "0":
+        return
+    modes = PROFILE_MODES if value in ("1", "all") else [mode.strip() for mode in value.split(",") if mode.strip()]
+    for mode in modes:
+        try:
+            PROFILER.set_mode(mode, True)
+        except ValueError as e:
+            print(f"Profiling: {e}", file=sys.stderr)
+
+
+def dump_on_exit():
+    # Called when the application or the command line ends
+    if PROFILER.active:
+        for path in PROFILER.dump():
+            print(f"Profiling: Results written to {path}", file=sys.stderr)
@@ -0,0 +1,77 @@
+import os
+
+from src.abstract_service import abstractmethod
+
+RADIO_ENV_VAR = "PYBLETOOLKIT_RADIO"  # "adafruit" (default) or "sim" for the in-process simulator
+DEFAULT_RADIO = "adafruit"
+
+
+class RadioBackend:
+    # What the application uses of a BLE radio, modelled on adafruit_ble.BLERadio. The advertisements have the
+    # `address.string`, `rssi`, `connectable`, `tx_power`, `complete_name` and `short_name` attributes, and the
+    # connections support `service_type in connection`, `connection[service_type]`, `connected` and `disconnect()`.
+    @abstractmethod
+    def start_scan(self, *advertisement_types, timeout=None, interval=0.1, window=0.1, **kwargs):
+        # Iterator of advertisements until `timeout` expires or `stop_scan` is called
+        pass
+
+    @abstractmethod
+    def stop_scan(self):
+        pass
+
+    @abstractmethod
+    def connect(self, advertisement, timeout=4.0):
+        pass
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.connections)
+
+    @property
+    def connections(self):
+        return ()
+
+
+class AdafruitRadio(RadioBackend):
+    # The real adapter, through adafruit_ble and the _bleio of Blinka
+    def __init__(self):
+        from adafruit_ble import BLERadio
+
+        self._radio = BLERadio()
+
+    def start_scan(self, *advertisement_types, timeout=None, interval=0.1, window=0.1, **kwargs):
+        return self._radio.start_scan(*advertisement_types, timeout=timeout, interval=interval, window=window,
+                                      **kwargs)
+
+    def stop_scan(self):
+        self._radio.stop_scan()
+
+    def connect(self, advertisement, timeout=4.0):
+        return self._radio.connect(advertisement, timeout=timeout)
+
+    @property
+    def connected(self) -> bool:
+        return self._radio.connected
+
+    @property
+    def connections(self):
+        return self._radio.connections
+
+
+_radio = None
+
+
+def get_radio() -> RadioBackend:
+    # The radio shared by the application, chosen with the PYBLETOOLKIT_RADIO environment variable
+    global _radio
+    if _radio is None:
+        name = os.environ.get(RADIO_ENV_VAR, DEFAULT_RADIO).lower()
+        if name == "sim":
+            from src.simulator import SimulatedRadio, SimulatorConfig
+
+            _radio = SimulatedRadio(SimulatorConfig.from_environment())
+        elif name == DEFAULT_RADIO:
+            _radio = AdafruitRadio()
+        else:
+            raise ValueError(f"Unknown radio backend '{name}' in {RADIO_ENV_VAR}, expected 'adafruit' or 'sim'")
+    return _radio
@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, Sequence, Union
+
+import numpy as np
+
+
+class RingBuffer:
+    # Fixed-capacity history of named channels backed by a single preallocated array.
+    # Each row is written twice (at i and i + capacity) so the stored rows are always contiguous in memory and
+    # `view` returns them in order without copying. Appending costs the same whatever the capacity.
+    def __init__(self, capacity: int, channels: Sequence[str], dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self._capacity = int(capacity)
+        self._channels: Dict[str, int] = {name: index for index, name in enumerate(channels)}
+        self._data = np.zeros((len(self._channels), 2 * self._capacity), dtype=dtype)
+        self._head = 0  # Next write position, in [0, capacity)
+        self._size = 0
+        self._total = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def channels(self):
+        return list(self._channels)
+
+    @property
+    def total(self) -> int:
+        # Number of rows appended since the creation or the last clear, including the overwritten ones
+        return self._total
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _row(self, values: Union[Dict[str, float], Sequence[float]]):
+        if isinstance(values, dict):
+            return [values[name] for name in self._channels]
+        return values
+
+    def append(self, values: Union[Dict[str, float], Sequence[float]]):
+        # `values` is either a mapping of channel names or a sequence in channel order
+        row = self._row(values)
+        self._data[:, self._head] = row
+        self._data[:, self._head + self._capacity] = row
+        self._head = (self._head + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+        self._total += 1
+
+    def extend(self, rows: Union[np.ndarray, Iterable[Sequence[float]]]):
+        # `rows` has one row per sample and one column per channel
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, len(self._channels))
+        count = len(rows)
+        if count == 0:
+            return
+        kept = rows[-self._capacity:]  # Older rows would be overwritten anyway
+        positions = (self._head + count - len(kept) + np.arange(len(kept))) % self._capacity
+        self._data[:, positions] = kept.T
+        self._data[:, positions + self._capacity] = kept.T
+        self._head = (self._head + count) % self._capacity
+        self._size = min(self._size + count, self._capacity)
+        self._total += count
+
+    def view(self, channel: str) -> np.ndarray:
+        # Read-only, oldest first. The view follows the buffer, copy it to keep the values past the next append.
+        end = self._head + self._capacity
+        view = self._data[self._channels[channel], end - self._size:end]
+        view.flags.writeable = False
+        return view
+
+    def views(self) -> Dict[str, np.ndarray]:
+        return {channel: self.view(channel) for channel in self._channels}
+
+    def last(self, channel: str):
+        if not self._size:
+            raise IndexError("RingBuffer is empty")
+        return self._data[self._channels[channel], self._head + self._capacity - 1]
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self._total = 0
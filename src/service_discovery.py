@@ -0,0 +1,82 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.abstract_service import AbstractService
+from src.service_register import ServicePlugin, ble_uuid, get_plugins, load_service_type, normalize_uuid
+
+DISCOVERY_WORKERS = 8  # Services set up at the same time, their constructors may talk to the device
+
+
+def _remote_services(connection) -> Optional[Dict[str, object]]:
+    # Every service of the peer by normalized UUID, from a single discovery. None when the connection cannot list
+    # its services (e.g. the simulator), each registered UUID is then looked up on its own.
+    bleio_connection = getattr(connection, "_bleio_connection", None)
+    if bleio_connection is None:
+        return None
+    return {normalize_uuid(str(remote.uuid)): remote for remote in bleio_connection.discover_remote_services()}
+
+
+def _construct(connection, service_type, remote) -> Tuple[object, object, AbstractService]:
+    # Runs on a pool thread: (uuid, remote service, service), the constructor may talk to the device. The caches of
+    # the connection are left to the calling thread.
+    if remote is None:  # Not a BLEConnection, e.g. the simulator, which looks the service up itself
+        return service_type.uuid, None, connection[service_type]
+    return service_type.uuid, remote, service_type(service=remote)
+
+
+def _cache(connection, uuid, remote, service):
+    # Like BLEConnection.__getitem__, so `connection[service_type]` returns this instance and `connection.disconnect()`
+    # deinitializes it. These are adafruit_ble internals, checked against 10.x, requirements.txt keeps it below 11.
+    connection._discovered_bleio_services[uuid] = remote
+    connection._constructed_services[uuid] = service
+
+
+def discover_services(connection, names: Optional[Iterable[str]] = None) -> Dict[str, AbstractService]:
+    # The registered services of the peer by name (all of them, or only `names`). The remote services are listed
+    # once and matched against the UUID index of the register, then the matched services are set up concurrently.
+    # Called from a connection thread, it talks to the device.
+    plugins = get_plugins()
+    if names is not None:
+        names = set(names)
+        plugins = {uuid: plugin for uuid, plugin in plugins.items() if plugin.name in names}
+
+    remote_services = _remote_services(connection)
+    if remote_services is None:
+        matched: List[Tuple[ServicePlugin, object]] = [(plugin, None) for plugin in plugins.values()
+                                                       if ble_uuid(plugin.uuid) in connection]
+    else:
+        matched = [(plugins[uuid], remote) for uuid, remote in remote_services.items() if uuid in plugins]
+    if not matched:
+        return {}
+
+    # The plugins are only imported when their service is found, on this thread like the cache lookups
+    services: Dict[str, AbstractService] = {}
+    pending = []
+    for plugin, remote in matched:
+        try:
+            service_type = load_service_type(plugin)
+        except Exception as e:
+            print(f"ServiceDiscovery: Error during loading {plugin.name}: {e}", file=sys.stderr)
+            continue
+        service = connection._constructed_services.get(service_type.uuid) if remote is not None else None
+        if service is not None:  # Already set up by an earlier discovery
+            services[plugin.name] = service
+        else:
+            pending.append((plugin, service_type, remote))
+    if not pending:
+        return services
+
+    with ThreadPoolExecutor(max_workers=min(DISCOVERY_WORKERS, len(pending))) as pool:
+        futures = [(plugin, pool.submit(_construct, connection, service_type, remote))
+                   for plugin, service_type, remote in pending]
+    for plugin, future in futures:  # The pool has joined, the caches are only written from this thread
+        try:
+            uuid, remote, service = future.result()
+        except Exception as e:  # The other services are still usable
+            print(f"ServiceDiscovery: Error during setting up {plugin.name}: {e}", file=sys.stderr)
+            continue
+        if remote is not None:
+            _cache(connection, uuid, remote, service)
+        services[plugin.name] = service
+    return services
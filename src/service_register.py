@@ -1,12 +1,129 @@
-from typing import Dict, Type
+import re
+import uuid as uuid_module
+from importlib import metadata
+from typing import Dict, List, NamedTuple, Optional, Type, Union
+
+from adafruit_ble.uuid import StandardUUID, VendorUUID
 
 from src.abstract_service import AbstractService
-from src.abstract_service_tab import AbstractServiceTab
-from src.exemples.ble_json_service import ExJSONService, ExJSONServiceTab
-from src.exemples.ble_uart_service import UARTService, UARTServiceTab
-
-# Service register mapping services to their corresponding tab classes
-SERVICE_REGISTER: Dict[Type[AbstractService], Type[AbstractServiceTab]] = {
-    ExJSONService: ExJSONServiceTab,
-    UARTService: UARTServiceTab,
-}
+from src.profiling import PROFILER, SERVICE_HOOKS, TAB_HOOKS
+from src.startup_timing import timed_import
+
+BLUETOOTH_BASE_UUID = "-0000-1000-8000-00805f9b34fb"  # 16 and 32-bit UUIDs are short for xxxxxxxx + this suffix
+PLUGIN_ENTRY_POINT_GROUP = "pybletoolkit.services"  # Installed packages can add ServicePlugin entries through it
+
+
+class ServicePlugin(NamedTuple):
+    # Manifest entry of a service: nothing is imported until a service with this UUID is found on a connection
+    name: str
+    uuid: str  # Any form accepted by `normalize_uuid`
+    service: str  # "module:class" of the AbstractService subclass
+    tab: str  # "module:class" of its AbstractServiceTab subclass, only imported by the GUI
+
+
+# Service register mapping the services to their tab classes
+SERVICE_REGISTER: List[ServicePlugin] = [
+    ServicePlugin("ExJSONService", "51ad213f-e568-4e35-84e4-67af89c79ef0",
+                  "src.exemples.ble_json_service:ExJSONService",
+                  "src.exemples.ble_json_service_tab:ExJSONServiceTab"),
+    ServicePlugin("UARTService", "6e400001-b5a3-f393-e0a9-e50e24dcca9e",
+                  "src.exemples.ble_uart_service:UARTService",
+                  "src.exemples.ble_uart_service_tab:UARTServiceTab"),
+    ServicePlugin("ExPackedService", "749e49e6-e9a5-43bb-a88d-5b9262bd533c",
+                  "src.exemples.ble_packed_service:ExPackedService",
+                  "src.exemples.ble_packed_service_tab:ExPackedServiceTab"),
+]
+
+_SHORT_UUID = re.compile(r"^(0x)?([0-9a-f]{4}|[0-9a-f]{8})$")
+_plugins: Optional[Dict[str, ServicePlugin]] = None  # By normalized UUID
+_classes: Dict[str, type] = {}
+
+
+def normalize_uuid(value: Union[str, int, object]) -> str:
+    # Lowercase 128-bit form of a UUID given as text ("180D", "0x180d" or 128-bit), as an int or as an adafruit UUID
+    if isinstance(value, int):
+        return f"{value:08x}{BLUETOOTH_BASE_UUID}"
+    text = str(value).strip().lower()
+    short = _SHORT_UUID.match(text)
+    if short:
+        return f"{int(short.group(2), 16):08x}{BLUETOOTH_BASE_UUID}"
+    return str(uuid_module.UUID(text))
+
+
+def ble_uuid(value: Union[str, int]):
+    # adafruit_ble UUID to look a service up on a connection, e.g. `ble_uuid(plugin.uuid) in connection`
+    normalized = normalize_uuid(value)
+    if normalized.endswith(BLUETOOTH_BASE_UUID) and normalized.startswith("0000"):
+        return StandardUUID(int(normalized[4:8], 16))
+    return VendorUUID(normalized)
+
+
+def _entry_point_plugins() -> List[ServicePlugin]:
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        entry_points = entry_points.select(group=PLUGIN_ENTRY_POINT_GROUP)
+    else:  # Python < 3.10
+        entry_points = entry_points.get(PLUGIN_ENTRY_POINT_GROUP, [])
+    plugins = []
+    for entry_point in entry_points:
+        try:
+            loaded = entry_point.load()  # A ServicePlugin or a list of them, from a module without heavy imports
+        except Exception as e:
+            print(f"ServiceRegister: Error during loading the plugin {entry_point.name}: {e}")
+            continue
+        plugins.extend(loaded if isinstance(loaded, (list, tuple)) and not isinstance(loaded, ServicePlugin)
+                       else [loaded])
+    return plugins
+
+
+def get_plugins() -> Dict[str, ServicePlugin]:
+    # SERVICE_REGISTER and the installed plugins by normalized UUID, read once. A UUID registered twice keeps its
+    # first entry.
+    global _plugins
+    if _plugins is None:
+        plugins = {}
+        for plugin in SERVICE_REGISTER + _entry_point_plugins():
+            try:
+                plugins.setdefault(normalize_uuid(plugin.uuid), plugin._replace(uuid=normalize_uuid(plugin.uuid)))
+            except (AttributeError, ValueError) as e:
+                print(f"ServiceRegister: Invalid plugin {plugin!r}: {e}")
+        _plugins = plugins
+    return _plugins
+
+
+def find_plugin(uuid) -> Optional[ServicePlugin]:
+    return get_plugins().get(normalize_uuid(uuid))
+
+
+def _import_class(path: str) -> type:
+    cls = _classes.get(path)
+    if cls is None:
+        module, _, name = path.partition(":")
+        cls = _classes[path] = getattr(timed_import(module), name)
+    return cls
+
+
+def load_service_type(plugin: ServicePlugin) -> Type[AbstractService]:
+    service_type = _import_class(plugin.service)
+    PROFILER.register(service_type, SERVICE_HOOKS)
+    if normalize_uuid(service_type.uuid) != plugin.uuid:
+        print(f"ServiceRegister: The UUID of {plugin.service} differs from its register entry {plugin.uuid}")
+    return service_type
+
+
+def get_service_type(uuid: str) -> Type[AbstractService]:
+    # Registered service with the given UUID, as returned by `AbstractService.get_uuid`
+    plugin = find_plugin(uuid)
+    if plugin is None:
+        raise KeyError(f"No service registered with the UUID {uuid}")
+    return load_service_type(plugin)
+
+
+def get_service_tab(service_type: Type[AbstractService]) -> type:
+    # Subclasses of a registered service (e.g. the simulated ones) have its UUID and use its tab
+    plugin = find_plugin(service_type.uuid) if service_type.uuid is not None else None
+    if plugin is None:
+        raise KeyError(f"No tab registered for {service_type.__name__}")
+    tab_type = _import_class(plugin.tab)
+    PROFILER.register(tab_type, TAB_HOOKS)
+    return tab_type
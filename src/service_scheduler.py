@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.abstract_service import AbstractService
+from src.metrics import SERVICE_READ_ERRORS, SERVICE_READ_SECONDS
+
+# Fraction used to spread the first read of each service over its interval (low-discrepancy sequence)
+PHASE_STEP = 0.6180339887
+
+
+class ScheduledRead:
+    def __init__(self, service: AbstractService, on_data, on_error, phase: float, link=None):
+        self.service = service
+        self.link = link  # Connection the service belongs to
+        self.on_data = on_data
+        self.on_error = on_error
+        self.interval = max(float(service.read_interval), 0.001)
+        self.priority = service.read_priority
+        self.deadline = service.read_deadline
+        self.due = time.monotonic() + phase * self.interval
+        self.active = True
+        self.missed_deadlines = 0
+        self.read_seconds = SERVICE_READ_SECONDS.labels(service=type(service).__name__, device=link)
+
+    def reschedule(self, now: float):
+        # Stay on the same phase grid, skipping the slots that were missed
+        self.due += self.interval
+        if self.due <= now:
+            self.due += ((now - self.due) // self.interval + 1) * self.interval
+
+
+class ServiceScheduler:
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._jobs: Dict[AbstractService, ScheduledRead] = {}
+        self._sequence = itertools.count()
+        self._phase_index = itertools.count()
+        self._link_usage: Dict[object, float] = {}  # Seconds spent reading each link
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def add(self, service: AbstractService, on_data, on_error, link=None):
+        # `link` identifies the connection of the service (e.g. the device address), see `_next_ready`
+        with self._condition:
+            self._remove(service)
+            job = ScheduledRead(service, on_data, on_error, phase=(next(self._phase_index) * PHASE_STEP) % 1.0,
+                                link=link)
+            if link not in self._link_usage:  # A new link starts level with the least served one
+                self._link_usage[link] = min(self._link_usage.values(), default=0.0)
+            self._jobs[service] = job
+            self._push(job)
+            self._start()
+            self._condition.notify()
+
+    def remove(self, service: AbstractService):
+        with self._condition:
+            self._remove(service)
+
+    def clear(self):
+        with self._condition:
+            for job in self._jobs.values():
+                job.active = False
+            self._jobs.clear()
+            self._heap.clear()
+            self._link_usage.clear()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.clear()
+
+    def _remove(self, service: AbstractService):
+        job = self._jobs.pop(service, None)
+        if job is not None:
+            job.active = False  # Its heap entry is dropped lazily when it comes up
+            if all(other.link != job.link for other in self._jobs.values()):
+                self._link_usage.pop(job.link, None)
+
+    def _charge(self, link, duration: float):
+        with self._condition:
+            if link in self._link_usage:
+                self._link_usage[link] += duration
+
+    def _push(self, job: ScheduledRead):
+        heapq.heappush(self._heap, (job.due, next(self._sequence), job))
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _next_ready(self, now: float) -> Optional[ScheduledRead]:
+        # Among the reads that are due, the highest priority goes first and the others keep their place. At equal
+        # priority the link that has used the adapter the least goes first, so a slow device cannot starve the others.
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if entry[2].active:
+                ready.append(entry)
+        if not ready:
+            return None
+        ready.sort(key=lambda entry: (-entry[2].priority, self._link_usage.get(entry[2].link, 0.0),
+                                      entry[0], entry[1]))
+        for entry in ready[1:]:
+            heapq.heappush(self._heap, entry)
+        return ready[0][2]
+
+    def _wait_for_job(self) -> Optional[ScheduledRead]:
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                job = self._next_ready(now)
+                if job is not None:
+                    return job
+                while self._heap and not self._heap[0][2].active:
+                    heapq.heappop(self._heap)
+                self._condition.wait(timeout=self._heap[0][0] - now if self._heap else None)
+        return None
+
+    def _run(self):
+        while True:
+            job = self._wait_for_job()
+            if job is None:
+                return
+
+            now = time.monotonic()
+            if job.deadline is not None and now - job.due > job.deadline:
+                job.missed_deadlines += 1  # Too late to be useful, wait for the next slot
+            else:
+                try:
+                    start = time.monotonic()
+                    try:
+                        data = job.service.read_pending()
+                    finally:
+                        duration = time.monotonic() - start
+                        self._charge(job.link, duration)
+                        job.read_seconds.observe(duration)
+                    job.on_data(data)
+                except Exception as e:
+                    SERVICE_READ_ERRORS.labels(service=type(job.service).__name__, device=job.link).inc()
+                    with self._condition:
+                        self._remove(job.service)
+                    job.on_error(e)
+                    continue
+
+            with self._condition:
+                if job.active:
+                    job.reschedule(time.monotonic())
+                    self._push(job)
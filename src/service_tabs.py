@@ -1,4 +1,6 @@
-from typing import Dict
+import os
+from tkinter import filedialog
+from typing import Dict, Optional, Tuple
 
 import customtkinter as ctk
 from CTkMessagebox import CTkMessagebox
@@ -6,32 +8,49 @@ from CTkToolTip import CTkToolTip
 from adafruit_ble import BLEConnection, Advertisement
 
 from src.abstract_service import AbstractService
-from src.service_register import SERVICE_REGISTER
+from src.service_discovery import discover_services
+from src.service_register import get_service_type
 from src.service_tabs_manager import ServiceTabsManager
+from src.session_log import SESSION_DIR, SESSION_EXTENSION, default_session_path
+from src.session_replay import DEFAULT_REPLAY_SPEED, REPLAY_SPEEDS, Record, ReplayedAddress, ReplayedAdvertisement, \
+    SessionLog, SessionPlayer, replayed_service
+from src.stats_panel import StatsWindow
 from src.utils import TRANSPARENT_COLOR, STD_PADDING
 
+REPLAY_UI_INTERVAL = 200  # ms between two updates of the replay position
+
 
 class ServicesBox(ctk.CTkFrame):
-    def __init__(self, master, select_service_cmd, **kwargs):
+    NO_DEVICE = "No Device Connected"
+    RECORD_HINT = "Record the payloads of the running services to a session log"
+
+    def __init__(self, master, select_service_cmd, record_cmd=None, replay_cmd=None, stats_cmd=None, **kwargs):
         super().__init__(master, **kwargs)
-        self._select_srv_cmd = select_service_cmd
-        self.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self._select_srv_cmd = select_service_cmd  # Called with (service, address of its device)
+        self._record_cmd = record_cmd  # Called with True/False, returns the path of the session log or None
+        self.grid_columnconfigure((0, 1, 2, 3, 4, 5, 6), weight=1)
         self.grid_rowconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
+        # Connected devices by address, with their services by name and the service last selected on each
+        self._devices: Dict[str, Tuple[Advertisement, Dict[str, AbstractService]]] = {}
+        self._selected_services: Dict[str, str] = {}
+        self._current_address = None
         self._service_dict: Dict[str, AbstractService] = {}
-        self._current_advertisement: Advertisement = None
 
         # Device frame
         self.device_frame = ctk.CTkFrame(master=self, fg_color=TRANSPARENT_COLOR)
         self.device_frame.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
-        self.device_label = ctk.CTkLabel(master=self.device_frame, text="No Device Connected", anchor="w")
-        self.device_label.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
+        self._device_options = ctk.CTkOptionMenu(master=self.device_frame, anchor="center", values=[],
+                                                 command=self.select_device_cmd)
+        self._device_options.set(value=self.NO_DEVICE)
+        self._device_options.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
         self.info_button = ctk.CTkButton(master=self.device_frame, width=20, height=20,
                                          text="i", state=ctk.DISABLED)
         self.info_button.grid(row=0, column=1, padx=(STD_PADDING, 50), pady=STD_PADDING, sticky="e")
 
-        self.tooltip = CTkToolTip(self.info_button, message="No device information available",
+        self._tooltip_message = "No device information available"
+        self.tooltip = CTkToolTip(self.info_button, message=self._tooltip_message,
                                   justify="left", padding=(STD_PADDING, STD_PADDING))
 
         # Select frame
@@ -52,26 +71,71 @@ class ServicesBox(ctk.CTkFrame):
                                         fg_color=TRANSPARENT_COLOR, justify='center')
         self._uuid_entry.grid(padx=1, pady=1, sticky="nsew")
 
-        self.update_services()
+        self._record_switch = ctk.CTkSwitch(master=self, text="Record", command=self._record_toggled)
+        self._record_switch.grid(row=0, column=4, padx=STD_PADDING, pady=STD_PADDING, sticky="e")
+        self._record_tooltip = CTkToolTip(self._record_switch, message=self.RECORD_HINT,
+                                          justify="left", padding=(STD_PADDING, STD_PADDING))
+        if record_cmd is None:
+            self._record_switch.configure(state=ctk.DISABLED)
+        self._replay_button = ctk.CTkButton(master=self, text="Replay...", width=80, command=replay_cmd,
+                                            state=ctk.NORMAL if replay_cmd else ctk.DISABLED)
+        self._replay_button.grid(row=0, column=5, padx=STD_PADDING, pady=STD_PADDING, sticky="e")
+        self._stats_button = ctk.CTkButton(master=self, text="Stats", width=60, command=stats_cmd,
+                                           state=ctk.NORMAL if stats_cmd else ctk.DISABLED)
+        self._stats_button.grid(row=0, column=6, padx=STD_PADDING, pady=STD_PADDING, sticky="e")
 
-    def update_services(self, advert: Advertisement = None, services_dict: Dict[str, AbstractService] = None):
-        if services_dict is None:
-            services_dict = {}
-        self._service_dict = services_dict
-        self._service_options.configure(values=list(self._service_dict.keys()))
+        self.select_device_cmd(None)
 
-        if advert:
-            self._current_advertisement = advert
-            self.device_label.configure(text=advert.address.string)
-            self._update_tooltip(advert)
+    def _record_toggled(self):
+        path = self._record_cmd(self._record_switch.get() == 1)
+        if path is None:
+            self._record_switch.deselect()
+            self._record_tooltip.configure(message=self.RECORD_HINT)
         else:
-            self.device_label.configure(text="No Device Connected")
+            self._record_tooltip.configure(message=f"Recording to {path}")
+
+    def add_device(self, advert: Advertisement, services_dict: Dict[str, AbstractService]):
+        address = advert.address.string
+        self._devices[address] = (advert, services_dict)
+        self._device_options.configure(values=list(self._devices))
+        self.select_device_cmd(address)
+
+    def remove_device(self, address: str) -> Dict[str, AbstractService]:
+        # Returns the services of the device
+        _, services_dict = self._devices.pop(address, (None, {}))
+        self._selected_services.pop(address, None)
+        self._device_options.configure(values=list(self._devices))
+        if address == self._current_address:
+            self.select_device_cmd(next(iter(self._devices), None))
+        return services_dict
+
+    def remove_all_devices(self):
+        self._devices.clear()
+        self._selected_services.clear()
+        self._device_options.configure(values=[])
+        self.select_device_cmd(None)
+
+    def select_device_cmd(self, address: str = None):
+        # Shows the services of an already connected device, nothing is reconnected
+        if address not in self._devices:
+            address = None
+        self._current_address = address
+        if address is None:
+            self._device_options.set(value=self.NO_DEVICE)
             self._update_tooltip()
+            self._service_dict = {}
+        else:
+            advert, self._service_dict = self._devices[address]
+            self._device_options.set(value=address)
+            self._update_tooltip(advert)
+        self._service_options.configure(values=list(self._service_dict.keys()))
 
         if self._service_dict:
-            default_value = list(self._service_dict.keys())[0]
-            self._service_options.set(value=default_value)
-            self.select_opt_cmd(default_value)
+            selected = self._selected_services.get(address)
+            if selected not in self._service_dict:
+                selected = list(self._service_dict.keys())[0]
+            self._service_options.set(value=selected)
+            self.select_opt_cmd(selected)
         else:
             self._service_options.set(value="")
             self._update_entry(self._uuid_entry)
@@ -79,7 +143,8 @@ class ServicesBox(ctk.CTkFrame):
     def select_opt_cmd(self, selected_option: str):
         if selected_option in self._service_dict.keys():
             srv = self._service_dict[selected_option]
-            self._select_srv_cmd(srv)
+            self._selected_services[self._current_address] = selected_option
+            self._select_srv_cmd(srv, self._current_address)
             uuid = srv.get_uuid().upper()
             self._update_entry(self._uuid_entry, uuid)
 
@@ -89,10 +154,18 @@ class ServicesBox(ctk.CTkFrame):
         entry.insert(0, text)
         entry.configure(state="readonly")
 
-    def _update_tooltip(self, advert: Advertisement = None):
+    def update_device_info(self, advert: Advertisement, rssi=None):
+        # Latest advertisement of a connected device, the tooltip shows the current one
+        address = advert.address.string
+        if address in self._devices:
+            self._devices[address] = (advert, self._devices[address][1])
+            if address == self._current_address:
+                self._update_tooltip(advert, rssi)
+
+    def _update_tooltip(self, advert: Advertisement = None, rssi=None):
         if advert:
-            message = (  # TODO : continuous update
-                f"RSSI: {advert.rssi}\n"
+            message = (
+                f"RSSI: {rssi if rssi is not None else advert.rssi}\n"
                 f"Tx Power: {advert.tx_power if advert.tx_power is not None else 'N/A'}\n"
                 f"Complete Name: {advert.complete_name or ''}\n"
                 f"Short Name: {advert.short_name or ''}"
@@ -100,42 +173,216 @@ class ServicesBox(ctk.CTkFrame):
         else:
             message = "No device information available"
 
-        self.tooltip.configure(message=message)
+        if message != self._tooltip_message:
+            self._tooltip_message = message
+            self.tooltip.configure(message=message)
+
+
+class ReplayBar(ctk.CTkFrame):
+    # Controls of the session log being replayed
+    def __init__(self, master, stop_cmd, **kwargs):
+        super().__init__(master, **kwargs)
+        self._player: Optional[SessionPlayer] = None
+        self._duration = 0.0
+        self._refresh_id = None
+        self.grid_columnconfigure(3, weight=1)
+
+        self._name_label = ctk.CTkLabel(master=self, text="", anchor="w")
+        self._name_label.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
+        self._play_button = ctk.CTkButton(master=self, text="Pause", width=70, command=self._play_cmd)
+        self._play_button.grid(row=0, column=1, padx=STD_PADDING, pady=STD_PADDING)
+        self._speed_options = ctk.CTkOptionMenu(master=self, values=list(REPLAY_SPEEDS), width=80,
+                                                command=self._speed_cmd)
+        self._speed_options.grid(row=0, column=2, padx=STD_PADDING, pady=STD_PADDING)
+        self._position_slider = ctk.CTkSlider(master=self, from_=0, to=1, command=self._seek_cmd)
+        self._position_slider.grid(row=0, column=3, padx=STD_PADDING, pady=STD_PADDING, sticky="ew")
+        self._time_label = ctk.CTkLabel(master=self, text="", width=120)
+        self._time_label.grid(row=0, column=4, padx=STD_PADDING, pady=STD_PADDING)
+        stop_button = ctk.CTkButton(master=self, text="Stop", width=70, command=stop_cmd)
+        stop_button.grid(row=0, column=5, padx=STD_PADDING, pady=STD_PADDING)
+
+    def start(self, player: SessionPlayer, name: str, duration: float):
+        self._player = player
+        self._duration = duration
+        self._name_label.configure(text=name)
+        self._speed_options.set(DEFAULT_REPLAY_SPEED)
+        player.set_speed(REPLAY_SPEEDS[DEFAULT_REPLAY_SPEED])
+        self._position_slider.configure(to=max(duration, 0.001))
+        self._refresh()
+
+    def stop(self):
+        self._player = None
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+
+    def _play_cmd(self):
+        if self._player is not None:
+            if self._player.paused or self._player.finished:
+                self._player.play()
+            else:
+                self._player.pause()
+            self._refresh()
+
+    def _speed_cmd(self, speed: str):
+        if self._player is not None:
+            self._player.set_speed(REPLAY_SPEEDS[speed])
+
+    def _seek_cmd(self, position: float):
+        if self._player is not None:
+            self._player.seek(position)
+
+    def _refresh(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+        player = self._player
+        if player is None:
+            self._refresh_id = None
+            return
+        self._position_slider.set(player.position)
+        self._time_label.configure(text=f"{player.position:.1f} / {self._duration:.1f} s")
+        self._play_button.configure(text="Play" if player.paused or player.finished else "Pause")
+        self._refresh_id = self.after(REPLAY_UI_INTERVAL, self._refresh)
 
 
 class ServiceTabs(ctk.CTkFrame):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, metrics_server=None, **kwargs):
         super().__init__(master, **kwargs)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=0)
         self.grid_rowconfigure(1, weight=10)
 
         self._services_box = ServicesBox(master=self, select_service_cmd=self._select_service_cmd,
-                                         fg_color=TRANSPARENT_COLOR)
+                                         record_cmd=self._record_cmd, replay_cmd=self._replay_cmd,
+                                         stats_cmd=self._stats_cmd, fg_color=TRANSPARENT_COLOR)
         self._services_box.pack(padx=STD_PADDING, pady=STD_PADDING)
 
-        service_tab = ctk.CTkFrame(master=self)
-        service_tab.grid_columnconfigure(0, weight=1)
-        service_tab.grid_rowconfigure(0, weight=1)
-        service_tab.pack(fill=ctk.BOTH, expand=True)
-        self._service_tabs_manager = ServiceTabsManager(master=service_tab)
+        # Shown while a session log is replayed
+        self._replay_bar = ReplayBar(master=self, stop_cmd=self.stop_replay)
+        self._replay: Optional[Tuple[SessionLog, SessionPlayer, list]] = None  # With the addresses of its devices
+
+        self._metrics_server = metrics_server  # Prometheus endpoint shown by the stats panel, if any
+        self._stats_window: Optional[StatsWindow] = None
+
+        self._service_tab = ctk.CTkFrame(master=self)
+        self._service_tab.grid_columnconfigure(0, weight=1)
+        self._service_tab.grid_rowconfigure(0, weight=1)
+        self._service_tab.pack(fill=ctk.BOTH, expand=True)
+        self._service_tabs_manager = ServiceTabsManager(master=self._service_tab)
 
-    def _select_service_cmd(self, service: AbstractService):
+    def _select_service_cmd(self, service: AbstractService, address: str):
         if not isinstance(service, AbstractService):
             err_msg = "Error: Provided service is not an instance of AbstractService"
             print(err_msg)
             CTkMessagebox(title="Error", message=err_msg, icon="cancel")
         else:
-            self._service_tabs_manager.select_service(service)
-
-    def connect(self, advert: Advertisement, connection: BLEConnection):
-        services_dict: Dict[str, AbstractService] = {}
-        for srv in SERVICE_REGISTER.keys():
-            if srv in connection:
-                print("Service found: " + str(srv))
-                services_dict[srv.__name__] = connection[srv]
-        self._services_box.update_services(advert, services_dict)
-
-    def disconnect(self):
-        self._services_box.update_services()
-        self._service_tabs_manager.disconnect()
+            self._service_tabs_manager.select_service(service, link=address)
+
+    def _stats_cmd(self):
+        if self._stats_window is None or not self._stats_window.winfo_exists():
+            self._stats_window = StatsWindow(master=self, server=self._metrics_server)
+        self._stats_window.lift()
+        self._stats_window.focus()
+
+    def _record_cmd(self, enabled: bool) -> Optional[str]:
+        if not enabled:
+            self.stop_recording()
+            return None
+        try:
+            return self._service_tabs_manager.start_recording(default_session_path()).path
+        except OSError as e:
+            err_msg = f"Error: Cannot create the session log: {e}"
+            print(err_msg)
+            CTkMessagebox(title="Error", message=err_msg, icon="cancel")
+            return None
+
+    def stop_recording(self):
+        recorder = self._service_tabs_manager.recorder
+        if recorder is not None:
+            self._service_tabs_manager.stop_recording()
+            print(f"Session log {recorder.path}: {recorder.written} payloads recorded, {recorder.dropped} dropped")
+
+    def _replay_cmd(self):
+        path = filedialog.askopenfilename(title="Replay a session log", initialdir=SESSION_DIR,
+                                          filetypes=[("Session logs", f"*{SESSION_EXTENSION}"), ("All files", "*")])
+        if path:
+            self.replay(path)
+
+    def replay(self, path: str):
+        # The streams of the session log are shown as devices whose services receive the recorded payloads through
+        # the same path as live notifications
+        self.stop_replay()
+        try:
+            log = SessionLog(path)
+        except (OSError, ValueError) as e:
+            err_msg = f"Error: Cannot open the session log: {e}"
+            print(err_msg)
+            CTkMessagebox(title="Error", message=err_msg, icon="cancel")
+            return
+
+        devices: Dict[str, Dict[str, AbstractService]] = {}
+        services: Dict[int, AbstractService] = {}  # By stream id
+        for stream in log.streams.values():
+            try:
+                service_type = get_service_type(stream.uuid)
+            except KeyError:
+                print(f"Replay: {stream.name} ({stream.uuid}) is not a registered service, its payloads are skipped")
+                continue
+            address = f"{stream.address or 'Unknown'} (replay)"
+            services[stream.stream_id] = replayed_service(service_type)
+            devices.setdefault(address, {})[service_type.__name__] = services[stream.stream_id]
+
+        def deliver(record: Record):
+            service = services.get(record.stream_id)
+            if service is not None:
+                service.deliver(record.payload)
+
+        name = os.path.basename(path)
+        player = SessionPlayer(log, deliver)
+        self._replay = (log, player, list(devices))
+        for address, services_dict in devices.items():
+            advert = ReplayedAdvertisement(ReplayedAddress(address), complete_name=f"Replay of {name}")
+            self._services_box.add_device(advert, services_dict)
+        self._replay_bar.pack(before=self._service_tab, fill=ctk.X, padx=STD_PADDING, pady=(0, STD_PADDING))
+        self._replay_bar.start(player, name, log.duration)
+        player.play()
+
+    def stop_replay(self):
+        if self._replay is None:
+            return
+        log, player, addresses = self._replay
+        self._replay = None
+        player.stop()
+        self._replay_bar.stop()
+        self._replay_bar.pack_forget()
+        for address in addresses:
+            self.disconnect(address)
+        log.close()
+
+    @staticmethod
+    def discover_services(connection: BLEConnection) -> Dict[str, AbstractService]:
+        # Called from the connection thread, it talks to the device and must not touch the widgets
+        services_dict = discover_services(connection)
+        for name in services_dict:
+            print("Service found: " + name)
+        return services_dict
+
+    def connect(self, advert: Advertisement, connection: BLEConnection, services_dict: Dict[str, AbstractService]):
+        self._services_box.add_device(advert, services_dict)
+
+    def update_device_info(self, advert: Advertisement, rssi=None):
+        self._services_box.update_device_info(advert, rssi)
+
+    def disconnect(self, address: str = None):
+        # Stops the services of one device, or of all of them
+        if address is None:
+            self._services_box.remove_all_devices()
+            self._service_tabs_manager.disconnect()
+        else:
+            services_dict = self._services_box.remove_device(address)
+            self._service_tabs_manager.disconnect(services_dict.values())
+
+    def quit_(self):
+        self.stop_replay()
+        self.disconnect()
+        self.stop_recording()
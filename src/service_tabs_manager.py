@@ -1,13 +1,15 @@
 import threading
-import time
-from threading import Thread
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 from CTkMessagebox import CTkMessagebox
 
 from src.abstract_service import AbstractService
 from src.abstract_service_tab import AbstractServiceTab
-from src.service_register import SERVICE_REGISTER
+from src.metrics import PayloadMetrics
+from src.service_register import get_service_tab
+from src.service_scheduler import ServiceScheduler
+from src.session_log import SessionRecorder
+from src.ui_dispatcher import UIDispatcher
 from src.utils import STD_PADDING
 
 
@@ -17,64 +19,123 @@ class ServiceTabsManager:
         self._current_service_tab = AbstractServiceTab(master=self._master)
         self._current_service_tab.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
         self._current_service = None
-        self._service_threads: Dict[AbstractService, Tuple[Thread, AbstractServiceTab, callable]] = {}
+        self._service_tabs: Dict[AbstractService, AbstractServiceTab] = {}
+        self._links: Dict[AbstractService, str] = {}  # Address of the device of each running service
+        self._payload_metrics: Dict[AbstractService, PayloadMetrics] = {}
+        self._scheduler = ServiceScheduler()  # One reading thread shared by all polled services
+        self._dispatcher = UIDispatcher(master=self._master)  # Hands the samples to the tabs once per frame
+        # Session log the raw payloads are appended to, with the stream id of each service in it
+        self._recording: Optional[Tuple[SessionRecorder, Dict[AbstractService, int]]] = None
         self._thread_lock = threading.Lock()
-        self._running = True  # Add a flag to control the running state
 
     def _is_service_running(self, service: AbstractService) -> bool:
-        return service in self._service_threads and self._service_threads[service][0].is_alive()
+        return service in self._service_tabs
 
     def _switch_service_tab(self, service: AbstractService):
         with self._thread_lock:
             self._current_service_tab.grid_remove()
-            self._current_service_tab = self._service_threads[service][1]
+            self._current_service_tab = self._service_tabs[service]
             self._current_service_tab.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
 
-    def select_service(self, service: AbstractService):
+    def _deliver(self, service: AbstractService, data):
+        # Called from the scheduler or notification threads, the tab is updated on the Tk thread
+        service_tab = self._service_tabs.get(service)
+        if data and service_tab is not None:
+            payload_metrics = self._payload_metrics.get(service)
+            if payload_metrics is not None:
+                payload_metrics.observe(data)
+            recording = self._recording
+            if recording is not None:
+                self._record(*recording, service, data)
+            self._dispatcher.post(service_tab, data)
+
+    def _record(self, recorder: SessionRecorder, streams: Dict[AbstractService, int], service: AbstractService,
+                data):
+        stream = streams.get(service)
+        if stream is None:
+            stream = streams[service] = recorder.stream(self._links.get(service), service.get_uuid(),
+                                                        type(service).__name__)
+        recorder.record(stream, data)
+
+    @property
+    def recorder(self) -> Optional[SessionRecorder]:
+        return self._recording[0] if self._recording is not None else None
+
+    def start_recording(self, path: str) -> SessionRecorder:
+        # Every payload received from now on is appended to the session log at `path`
+        self.stop_recording()
+        recorder = SessionRecorder(path)
+        self._recording = (recorder, {})
+        return recorder
+
+    def stop_recording(self):
+        recording, self._recording = self._recording, None
+        if recording is not None:
+            recording[0].close()  # Writes what is still queued
+
+    @property
+    def dispatcher(self) -> UIDispatcher:
+        return self._dispatcher
+
+    def _read_error(self, service: AbstractService, error: Exception):
+        print(f"ServiceTabsManager: Error during updating data: {error}")
+        self._master.after(0, self._ask_retry, service)
+
+    def _ask_retry(self, service: AbstractService):
+        if service not in self._service_tabs:
+            return
+        msg = CTkMessagebox(master=self._master, title="Error", icon="cancel",
+                            message="During updating data", option_1="Retry", option_2="Cancel",
+                            topmost=False, sound=True, justify="center")
+        if msg.get() == "Retry" and service in self._service_tabs:
+            self._start_reading(service)
+
+    def _start_reading(self, service: AbstractService):
+        deliver = lambda data: self._deliver(service, data)
+        if not (service.push_based and service.subscribe(deliver)):  # Polling is the fallback
+            self._scheduler.add(service, deliver, lambda e: self._read_error(service, e),
+                                link=self._links.get(service))
+
+    def select_service(self, service: AbstractService, link: str = None):
+        # `link` is the address of the device, the reads of the different devices are shared fairly
         need_switch = (service != self._current_service)
 
         if need_switch:
             self._current_service = service
 
         if not self._is_service_running(service):
-            service_tab = SERVICE_REGISTER[type(service)](self._master)
-
-            def task(running_flag):
-                while running_flag():
-                    try:
-                        data = service.read()
-                        if data:
-                            self._master.after(0, lambda d=data: service_tab.update_data(d))
-                        time.sleep(1)  # TODO: add to doc
-                    except Exception as e:
-                        print(f"ServiceTabsManager: Error during updating data: {e}")
-                        msg = CTkMessagebox(master=self._master, title="Error", icon="cancel",
-                                            message="During updating data", option_1="Retry", option_2="Cancel",
-                                            topmost=False, sound=True, justify="center")
-                        if msg.get() == "Cancel":
-                            break
-
-            running_flag = lambda: self._running
-
+            service_tab = get_service_tab(type(service))(self._master)
+            self._dispatcher.register(service_tab, link)
             with self._thread_lock:
-                thread = Thread(target=task, args=(running_flag,), daemon=True)
-                self._service_threads[service] = (thread, service_tab, running_flag)
-                self._service_threads[service][0].start()
+                self._service_tabs[service] = service_tab
+                self._links[service] = link
+                self._payload_metrics[service] = PayloadMetrics(type(service).__name__, link)
+            self._start_reading(service)
 
         if need_switch:
             self._switch_service_tab(service)
 
-    def disconnect(self):
-        if self._service_threads:  # Check if it is not empty
-            self._running = False  # Set the flag to stop all threads
-            for service, (thread, service_tab, _) in self._service_threads.items():
-                thread.join()  # Wait for each thread to finish
-                service_tab.grid_remove()  # Remove the service tab from the grid
-                service_tab.destroy()  # Destroy the frame to free up resources
+    def disconnect(self, services: Iterable[AbstractService] = None):
+        # Stops the given services, or all of them
+        with self._thread_lock:
+            if services is None:
+                services = list(self._service_tabs)
+            service_tabs = {service: self._service_tabs.pop(service) for service in services
+                            if service in self._service_tabs}
+            for service in service_tabs:
+                self._links.pop(service, None)
+                self._payload_metrics.pop(service, None)
+        if not service_tabs:
+            return
+
+        for service, service_tab in service_tabs.items():
+            self._scheduler.remove(service)  # Stop its polled reads
+            service.unsubscribe()
+            self._dispatcher.discard(service_tab)
+            service_tab.grid_remove()  # Remove the service tab from the grid
+            service_tab.destroy()  # Destroy the frame to free up resources
 
-            self._service_threads.clear()  # Clear the dictionary of service threads
+        if self._current_service in service_tabs:
             self._current_service_tab = AbstractServiceTab(master=self._master)
             self._current_service_tab.grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING, sticky="nsew")
             self._current_service = None
-            self._service_threads = {}
-            self._running = True
@@ -0,0 +1,269 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Session log: the raw payloads of the services, appended to a binary file as they are received.
+#
+#   header   SESSION_MAGIC, format version, wall-clock time of the start (time.time())
+#   records  length of the body (u32), record type (u8), body
+#   trailer  offset of the FOOTER record (u64), END_MAGIC; only present when the log was closed
+#
+# Records:
+#   STREAM  stream id (u16), then the device address, service UUID and service name, each as u8 length + UTF-8
+#   DATA    stream id (u16), payload kind (u8), timestamp (u64, ns of time.monotonic since the start), payload
+#   INDEX   offset of the previous INDEX record (u64, 0 for the first), entry count (u32), then the entries:
+#           timestamp (u64) and offset (u64) of every INDEX_STRIDE-th DATA record
+#   FOOTER  offset of the last INDEX record (u64), DATA records written (u64), DATA records dropped (u64),
+#           timestamp of the last DATA record (u64), stream count (u32), then the offset of each STREAM record (u64)
+#
+# Integers are little-endian. A log that was not closed (crash, power loss) has no trailer and may end with a
+# partial record, everything before it can still be read by following the length prefixes.
+SESSION_MAGIC = b"PYBLELOG"
+END_MAGIC = b"PYBLEEND"
+SESSION_VERSION = 1
+SESSION_EXTENSION = ".blelog"
+SESSION_DIR = "sessions"
+
+HEADER = struct.Struct("<8sHd")
+RECORD_HEADER = struct.Struct("<IB")
+STREAM_ID = struct.Struct("<H")
+DATA_HEADER = struct.Struct("<HBQ")
+INDEX_HEADER = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQ")
+FOOTER = struct.Struct("<QQQQI")
+STREAM_OFFSET = struct.Struct("<Q")
+TRAILER = struct.Struct("<Q8s")
+
+RECORD_STREAM = 1
+RECORD_DATA = 2
+RECORD_INDEX = 3
+RECORD_FOOTER = 4
+
+# How the payload was given to `record`, so it is replayed as the same type
+PAYLOAD_BYTES = 0
+PAYLOAD_TEXT = 1  # str, stored as UTF-8
+PAYLOAD_JSON = 2  # Any other value, stored as JSON
+
+INDEX_STRIDE = 256  # DATA records between two index entries
+INDEX_ENTRIES = 64  # Entries per INDEX record
+RECORD_QUEUE_SIZE = 65_536  # Payloads waiting for the writer, the newest are dropped when it is full
+WRITE_BUFFER_SIZE = 1 << 20  # bytes
+FLUSH_INTERVAL = 1.0  # s, longest time a record stays in the buffers before being written to the file
+CLOSE_POLL_INTERVAL = 0.1  # s between two checks that the writer is still alive while `close` waits for room
+MAX_STREAMS = 1 << 16
+
+
+def default_session_path(directory: str = SESSION_DIR) -> str:
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S") + SESSION_EXTENSION)
+
+
+def encode_payload(payload) -> Tuple[int, bytes]:
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return PAYLOAD_BYTES, bytes(payload)
+    if isinstance(payload, str):
+        return PAYLOAD_TEXT, payload.encode("utf-8")
+    return PAYLOAD_JSON, json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def decode_payload(kind: int, data: bytes):
+    if kind == PAYLOAD_BYTES:
+        return data
+    if kind == PAYLOAD_TEXT:
+        return data.decode("utf-8")
+    if kind == PAYLOAD_JSON:
+        return json.loads(data)
+    raise ValueError(f"Unknown payload kind {kind}")
+
+
+def _short_string(text: str) -> bytes:
+    data = (text or "").encode("utf-8")[:255]
+    return bytes((len(data),)) + data
+
+
+class SessionRecorder:
+    # Appends the payloads to a session log without blocking the callers: `record` timestamps and encodes the payload
+    # and queues it, a background thread writes the records through a buffered file. When the writer cannot keep up
+    # and RECORD_QUEUE_SIZE payloads are waiting, the new ones are dropped and counted, like the payloads that cannot
+    # be encoded (e.g. NumPy numbers, which JSON does not know).
+    # `stream` and `record` are thread-safe, they can be called from the reading and notification threads.
+    def __init__(self, path: str, queue_size: int = RECORD_QUEUE_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self._path = path
+        self._flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self._start_ns = time.monotonic_ns()
+        self._file.write(HEADER.pack(SESSION_MAGIC, SESSION_VERSION, time.time()))
+        self._offset = HEADER.size
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._streams: Dict[Tuple[str, str], int] = {}
+        self._new_streams: List[bytes] = []  # STREAM records not written yet
+        self._lock = threading.Lock()
+        self._closed = False
+        self._failed = False  # Set by the writer on an I/O error, the payloads are not accepted any more
+        self._dropped = 0
+        self._unencodable_reported = False
+
+        # Only used by the writer thread
+        self._written = 0
+        self._index_entries: List[Tuple[int, int]] = []
+        self._last_index = 0
+        self._last_timestamp = 0
+        self._stream_offsets: List[int] = []
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def size(self) -> int:
+        # Bytes written or waiting in the file buffer
+        return self._offset
+
+    def stream(self, address: Optional[str], uuid: str, name: str = "") -> int:
+        # Id of the stream of a service of a device, to pass to `record`
+        key = (address or "", uuid)
+        with self._lock:
+            stream_id = self._streams.get(key)
+            if stream_id is None:
+                if len(self._streams) >= MAX_STREAMS:
+                    raise ValueError("Too many streams in one session log")
+                stream_id = self._streams[key] = len(self._streams)
+                self._new_streams.append(STREAM_ID.pack(stream_id) + _short_string(key[0]) + _short_string(uuid)
+                                         + _short_string(name))
+            return stream_id
+
+    def record(self, stream_id: int, payload) -> bool:
+        # Returns False when the payload was dropped
+        if self._closed or self._failed:
+            return False
+        timestamp = time.monotonic_ns() - self._start_ns
+        try:
+            kind, data = encode_payload(payload)  # Copied, the caller may reuse its buffer
+        except (TypeError, ValueError) as e:
+            with self._lock:
+                self._dropped += 1
+                reported, self._unencodable_reported = self._unencodable_reported, True
+            if not reported:
+                print(f"SessionRecorder: Cannot encode a {type(payload).__name__} payload, dropped: {e}")
+            return False
+        try:
+            self._queue.put_nowait((stream_id, timestamp, kind, data))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+    def close(self):
+        # Writes the pending records, the last index and the footer
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        while self._thread.is_alive():  # A full queue is not waited on once the writer is gone
+            try:
+                self._queue.put(None, timeout=CLOSE_POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+
+    def _write_record(self, record_type: int, body: bytes) -> int:
+        offset = self._offset
+        self._file.write(RECORD_HEADER.pack(len(body), record_type))
+        self._file.write(body)
+        self._offset += RECORD_HEADER.size + len(body)
+        return offset
+
+    def _write_new_streams(self):
+        with self._lock:
+            new_streams, self._new_streams = self._new_streams, []
+        for body in new_streams:
+            self._stream_offsets.append(self._write_record(RECORD_STREAM, body))
+
+    def _write_index(self):
+        if self._index_entries:
+            body = INDEX_HEADER.pack(self._last_index, len(self._index_entries)) + b"".join(
+                INDEX_ENTRY.pack(timestamp, offset) for timestamp, offset in self._index_entries)
+            self._last_index = self._write_record(RECORD_INDEX, body)
+            self._index_entries = []
+
+    def _write_data(self, stream_id: int, timestamp: int, kind: int, data: bytes):
+        if self._new_streams:  # A stream is always defined before its first payload is queued
+            self._write_new_streams()
+        offset = self._write_record(RECORD_DATA, DATA_HEADER.pack(stream_id, kind, timestamp) + data)
+        self._last_timestamp = max(self._last_timestamp, timestamp)
+        if self._written % INDEX_STRIDE == 0:
+            self._index_entries.append((timestamp, offset))
+            if len(self._index_entries) >= INDEX_ENTRIES:
+                self._write_index()
+        self._written += 1
+
+    def _write_footer(self):
+        self._write_new_streams()
+        self._write_index()
+        body = FOOTER.pack(self._last_index, self._written, self._dropped, self._last_timestamp,
+                           len(self._stream_offsets)) + b"".join(map(STREAM_OFFSET.pack, self._stream_offsets))
+        footer = self._write_record(RECORD_FOOTER, body)
+        self._file.write(TRAILER.pack(footer, END_MAGIC))
+        self._offset += TRAILER.size
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if self._failed:
+                continue  # Keep draining the queue so `record` does not block
+            try:
+                if item:
+                    self._write_data(*item)
+                    while True:  # Everything that arrived in the meantime, in one go
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is None:
+                            break
+                        self._write_data(*item)
+                if time.monotonic() - last_flush >= self._flush_interval:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:  # The writer keeps draining the queue, so neither `record` nor `close` blocks
+                print(f"SessionRecorder: Error during writing {self._path}: {e}")
+                self._failed = True
+            if item is None:
+                break
+
+        try:
+            if not self._failed:
+                self._write_footer()
+            self._file.close()
+        except Exception as e:
+            print(f"SessionRecorder: Error during closing {self._path}: {e}")
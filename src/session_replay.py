@@ -0,0 +1,387 @@
+import bisect
+import math
+import mmap
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type
+
+from src.abstract_service import AbstractService
+from src.session_log import (DATA_HEADER, END_MAGIC, FOOTER, HEADER, INDEX_ENTRY, INDEX_HEADER, INDEX_STRIDE,
+                             RECORD_DATA, RECORD_FOOTER, RECORD_HEADER, RECORD_INDEX, RECORD_STREAM, SESSION_MAGIC,
+                             SESSION_VERSION, STREAM_ID, STREAM_OFFSET, TRAILER, decode_payload)
+
+AS_FAST_AS_POSSIBLE = math.inf  # Speed at which the records are delivered without waiting
+REPLAY_SPEEDS = {"1x": 1.0, "2x": 2.0, "10x": 10.0, "100x": 100.0, "Max": AS_FAST_AS_POSSIBLE}
+DEFAULT_REPLAY_SPEED = "1x"
+NS_PER_S = 1_000_000_000
+
+
+class StreamInfo(NamedTuple):
+    stream_id: int
+    address: str
+    uuid: str
+    name: str
+
+
+class Record(NamedTuple):
+    stream_id: int
+    timestamp: float  # s since the start of the recording
+    payload: object
+
+
+class SessionLog:
+    # Read-only view of a session log written by SessionRecorder (see src/session_log.py for the format). The file
+    # is memory-mapped, only the pages that are read are loaded, so seeking in a large capture is cheap. A closed log
+    # is opened from its footer and index records; a log that was not closed is scanned once to rebuild them, up to
+    # its last complete record.
+    def __init__(self, path: str):
+        self._path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a session log")
+        try:
+            self._open()
+        except (ValueError, UnicodeDecodeError, IndexError) as e:
+            self.close()
+            raise ValueError(f"{path} is not a valid session log: {e}")
+
+    def _open(self):
+        if len(self._map) < HEADER.size:
+            raise ValueError("too short")
+        magic, version, self._start_time = HEADER.unpack_from(self._map, 0)
+        if magic != SESSION_MAGIC:
+            raise ValueError("bad magic")
+        if version > SESSION_VERSION:
+            raise ValueError(f"format version {version} is not supported")
+
+        self._streams: Dict[int, StreamInfo] = {}
+        self._index_timestamps: List[int] = []  # Non-decreasing, for bisect
+        self._index_offsets: List[int] = []
+        self._end = len(self._map)  # Offset after the last DATA record
+        self._last_timestamp = 0
+        self._records = 0
+        self._dropped = 0
+        self._complete = self._read_footer()
+        if not self._complete:
+            self._scan()
+
+    def _record_at(self, offset: int) -> Tuple[int, int, int]:
+        # (record type, offset of the body, offset of the next record), ValueError past the last complete record
+        if offset + RECORD_HEADER.size > len(self._map):
+            raise ValueError("truncated record")
+        length, record_type = RECORD_HEADER.unpack_from(self._map, offset)
+        body = offset + RECORD_HEADER.size
+        if body + length > len(self._map):
+            raise ValueError("truncated record")
+        return record_type, body, body + length
+
+    def _add_stream(self, body: int, end: int):
+        (stream_id,), position = STREAM_ID.unpack_from(self._map, body), body + STREAM_ID.size
+        fields = []
+        for _ in range(3):
+            length = self._map[position]
+            fields.append(self._map[position + 1:position + 1 + length].decode("utf-8"))
+            position += 1 + length
+        if position > end:
+            raise ValueError("bad stream record")
+        self._streams[stream_id] = StreamInfo(stream_id, *fields)
+
+    def _add_index_entry(self, timestamp: int, offset: int):
+        if self._index_timestamps:
+            timestamp = max(timestamp, self._index_timestamps[-1])
+        self._index_timestamps.append(timestamp)
+        self._index_offsets.append(offset)
+
+    def _read_footer(self) -> bool:
+        if len(self._map) < HEADER.size + TRAILER.size:
+            return False
+        footer, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != END_MAGIC:
+            return False
+        record_type, body, _ = self._record_at(footer)
+        if record_type != RECORD_FOOTER:
+            raise ValueError("bad footer")
+        last_index, self._records, self._dropped, self._last_timestamp, stream_count = FOOTER.unpack_from(
+            self._map, body)
+        for i in range(stream_count):
+            offset, = STREAM_OFFSET.unpack_from(self._map, body + FOOTER.size + i * STREAM_OFFSET.size)
+            record_type, stream_body, stream_end = self._record_at(offset)
+            if record_type != RECORD_STREAM:
+                raise ValueError("bad stream offset")
+            self._add_stream(stream_body, stream_end)
+
+        # The INDEX records are chained from the last one to the first
+        blocks = []
+        while last_index:
+            record_type, body, _ = self._record_at(last_index)
+            if record_type != RECORD_INDEX:
+                raise ValueError("bad index offset")
+            last_index, count = INDEX_HEADER.unpack_from(self._map, body)
+            blocks.append([INDEX_ENTRY.unpack_from(self._map, body + INDEX_HEADER.size + i * INDEX_ENTRY.size)
+                           for i in range(count)])
+        for block in reversed(blocks):
+            for timestamp, offset in block:
+                self._add_index_entry(timestamp, offset)
+        self._end = footer
+        return True
+
+    def _scan(self):
+        offset = HEADER.size
+        while True:
+            try:
+                record_type, body, end = self._record_at(offset)
+            except ValueError:
+                break
+            if record_type == RECORD_STREAM:
+                self._add_stream(body, end)
+            elif record_type == RECORD_DATA:
+                if body + DATA_HEADER.size > end:
+                    break
+                timestamp = DATA_HEADER.unpack_from(self._map, body)[2]
+                if self._records % INDEX_STRIDE == 0:
+                    self._add_index_entry(timestamp, offset)
+                self._last_timestamp = max(self._last_timestamp, timestamp)
+                self._records += 1
+            elif record_type == RECORD_FOOTER:
+                break
+            offset = end
+        self._end = offset
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def start_time(self) -> float:
+        # Wall-clock time of the start of the recording (time.time())
+        return self._start_time
+
+    @property
+    def duration(self) -> float:
+        # s, timestamp of the last record
+        return self._last_timestamp / NS_PER_S
+
+    @property
+    def complete(self) -> bool:
+        # False when the log was not closed, it was read up to its last complete record
+        return self._complete
+
+    @property
+    def record_count(self) -> int:
+        return self._records
+
+    @property
+    def dropped(self) -> int:
+        # Payloads the recorder could not write, only known for a complete log
+        return self._dropped
+
+    @property
+    def streams(self) -> Dict[int, StreamInfo]:
+        return self._streams
+
+    def offset_at(self, seconds: float) -> int:
+        # Offset of the first record at or after `seconds`
+        target = int(seconds * NS_PER_S)
+        position = bisect.bisect_right(self._index_timestamps, target) - 1
+        offset = self._index_offsets[position] if position >= 0 else HEADER.size
+        while offset < self._end:
+            record_type, body, end = self._record_at(offset)
+            if record_type == RECORD_DATA and DATA_HEADER.unpack_from(self._map, body)[2] >= target:
+                break
+            offset = end
+        return offset
+
+    def read_from(self, offset: int = HEADER.size) -> Iterator[Tuple[Record, int]]:
+        # Yields the records from `offset` on, with the offset of the next record
+        while offset < self._end:
+            record_type, body, end = self._record_at(offset)
+            offset = end
+            if record_type == RECORD_DATA:
+                stream_id, kind, timestamp = DATA_HEADER.unpack_from(self._map, body)
+                payload = decode_payload(kind, self._map[body + DATA_HEADER.size:end])
+                yield Record(stream_id, timestamp / NS_PER_S, payload), offset
+
+    def records(self, start: float = 0.0) -> Iterator[Record]:
+        for record, _ in self.read_from(self.offset_at(start)):
+            yield record
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayedService:
+    # Mixed into a service class by `replayed_service`: a push-based service without a device, whose payloads are
+    # handed to `deliver` by the player and go through the same callback as live notifications
+    push_based = True
+
+    def __init__(self):
+        # The _bleio service of the parent classes is not created
+        self._replay_callback = None
+
+    def read(self):
+        return None
+
+    def read_pending(self):
+        return None
+
+    def write(self):
+        pass
+
+    def subscribe(self, callback) -> bool:
+        self._replay_callback = callback
+        return True
+
+    def unsubscribe(self):
+        self._replay_callback = None
+
+    def deliver(self, payload):
+        callback = self._replay_callback
+        if callback is not None:
+            callback(payload)
+
+
+class ReplayedAddress(NamedTuple):
+    string: str
+
+
+class ReplayedAdvertisement(NamedTuple):
+    # Stands for the advertisement of a replayed device, with the attributes the service tabs show
+    address: ReplayedAddress
+    complete_name: Optional[str] = None
+    short_name: Optional[str] = None
+    rssi: Optional[int] = None
+    tx_power: Optional[int] = None
+    connectable: bool = False
+
+
+_REPLAYED_TYPES: Dict[Type[AbstractService], Type[AbstractService]] = {}
+
+
+def replayed_service(service_type: Type[AbstractService]) -> AbstractService:
+    # Instance of a subclass of `service_type`, so it is shown with the tab of `service_type`
+    replayed_type = _REPLAYED_TYPES.get(service_type)
+    if replayed_type is None:
+        replayed_type = type(f"Replayed{service_type.__name__}", (ReplayedService, service_type), {})
+        _REPLAYED_TYPES[service_type] = replayed_type
+    service = replayed_type.__new__(replayed_type)
+    ReplayedService.__init__(service)
+    return service
+
+
+class SessionPlayer:
+    # Delivers the records of a session log with their recorded timing, scaled by `speed` (AS_FAST_AS_POSSIBLE: no
+    # waiting), from a background thread. `deliver(record)` is called from that thread, as a notification callback
+    # would be. The controls are thread-safe and take effect before the next record; `on_finished()` is called from
+    # the player thread at the end of the log.
+    def __init__(self, log: SessionLog, deliver: Callable[[Record], None], speed: float = 1.0,
+                 on_finished: Callable[[], None] = None):
+        self._log = log
+        self._deliver = deliver
+        self._on_finished = on_finished
+        self._speed = speed
+        self._offset = log.offset_at(0.0)  # Next record to deliver
+        self._position = 0.0  # s, timestamp of the last record delivered
+        self._paused = True
+        self._finished = False
+        self._stopped = False
+        self._generation = 0  # Incremented by every control, the player thread restarts its timing from there
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def position(self) -> float:
+        return self._position
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def _control(self, **changes):
+        with self._condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._generation += 1
+            self._condition.notify_all()
+
+    def play(self):
+        if self._finished:
+            self.seek(0.0)
+        self._control(_paused=False)
+
+    def pause(self):
+        self._control(_paused=True)
+
+    def set_speed(self, speed: float):
+        if speed <= 0:
+            raise ValueError("The replay speed must be positive")
+        self._control(_speed=speed)
+
+    def seek(self, seconds: float):
+        seconds = min(max(seconds, 0.0), self._log.duration)
+        self._control(_offset=self._log.offset_at(seconds), _position=seconds, _finished=False)
+
+    def stop(self):
+        # The log is not closed, the player cannot be restarted
+        self._control(_stopped=True)
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (self._paused or self._finished):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, offset, speed = self._generation, self._offset, self._speed
+
+            finished = self._play(generation, offset, speed)
+            if finished:
+                with self._condition:
+                    if generation != self._generation:
+                        continue
+                    self._finished = True
+                if self._on_finished is not None:
+                    self._on_finished()
+
+    def _play(self, generation: int, offset: int, speed: float) -> bool:
+        # Returns True at the end of the log, False when a control interrupted the playback
+        start_wall = None
+        for record, next_offset in self._log.read_from(offset):
+            if start_wall is None:  # The timing starts from the first record, after a seek or a pause
+                start_wall, start_timestamp = time.monotonic(), record.timestamp
+            if speed != AS_FAST_AS_POSSIBLE:
+                delay = start_wall + (record.timestamp - start_timestamp) / speed - time.monotonic()
+                if delay > 0:
+                    with self._condition:
+                        if self._condition.wait_for(lambda: generation != self._generation, timeout=delay):
+                            return False
+            with self._condition:
+                if generation != self._generation:
+                    return False
+                self._offset = next_offset
+                self._position = max(self._position, record.timestamp)
+            try:
+                self._deliver(record)
+            except Exception as e:
+                print(f"SessionPlayer: Error during delivering a record of stream {record.stream_id}: {e}")
+        return True
@@ -0,0 +1,333 @@
+import heapq
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from src.exemples.ble_json_service import ExJSONService
+from src.exemples.ble_packed_service import SENSOR_SCHEMA, ExPackedService
+from src.exemples.ble_uart_service import UARTService
+from src.line_splitter import LineSplitter
+from src.radio import RadioBackend
+from src.service_register import normalize_uuid
+
+SIM_ENV_PREFIX = "PYBLETOOLKIT_SIM_"  # e.g. PYBLETOOLKIT_SIM_ADVERTISERS=300
+SCAN_POLL_INTERVAL = 0.05  # s, longest time a scan takes to notice `stop_scan`
+
+
+class SimulatorConfig(NamedTuple):
+    advertisers: int = 20
+    peripherals: int = 2  # The first advertisers are connectable and expose the simulated services
+    advertising_rate: float = 5.0  # Advertisements per second and per advertiser
+    rssi: float = -65.0  # Mean RSSI, each advertiser gets a fixed offset within +/- rssi_spread / 2
+    rssi_spread: float = 30.0
+    rssi_jitter: float = 4.0  # Standard deviation of the RSSI of an advertisement around its advertiser's
+    json_rate: float = 1.0  # Reads per second of the JSON service
+    packed_rate: float = 1.0  # Reads per second of the packed service
+    uart_rate: float = 20.0  # Notifications per second of the UART service
+    uart_payload: int = 20  # Bytes per notification
+    latency: float = 0.02  # s added to each connect, discovery, read and notification
+    drop_rate: float = 0.0  # Fraction of the reads and notifications that are lost
+    connect_failure_rate: float = 0.0  # Fraction of the connection attempts that fail
+    seed: int = 0
+
+    @classmethod
+    def from_environment(cls, environ=None) -> "SimulatorConfig":
+        # Every field can be set with PYBLETOOLKIT_SIM_<FIELD>
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field, default in cls._field_defaults.items():
+            value = environ.get(SIM_ENV_PREFIX + field.upper())
+            if value is not None:
+                values[field] = type(default)(value)
+        return cls(**values)
+
+
+class SimulatedAddress(NamedTuple):
+    string: str
+
+
+class SimulatedAdvertisement:
+    def __init__(self, address: str, rssi: int, connectable: bool, complete_name: Optional[str] = None,
+                 short_name: Optional[str] = None, tx_power: Optional[int] = None):
+        self.address = SimulatedAddress(address)
+        self.rssi = rssi
+        self.connectable = connectable
+        self.complete_name = complete_name
+        self.short_name = short_name
+        self.tx_power = tx_power
+
+
+class _Advertiser:
+    def __init__(self, index: int, config: SimulatorConfig, rng: random.Random):
+        self.address = f"5A:11:00:00:{index // 256:02X}:{index % 256:02X}"
+        self.connectable = index < config.peripherals
+        if self.connectable:
+            self.name = f"PyBLE Sim Board {index}"
+        else:
+            self.name = f"Sim Beacon {index}" if index % 2 else None
+        self.rssi = config.rssi + (rng.random() - 0.5) * config.rssi_spread
+        self.tx_power = 4 if self.connectable else None
+
+    def advertise(self, config: SimulatorConfig, rng: random.Random) -> SimulatedAdvertisement:
+        rssi = round(min(self.rssi + rng.gauss(0.0, config.rssi_jitter), -20))
+        short_name = self.name.split()[-1] if self.name else None
+        return SimulatedAdvertisement(self.address, rssi, self.connectable, self.name, short_name, self.tx_power)
+
+
+def _wait(delay: float, stop_event: threading.Event = None) -> bool:
+    # Returns True when `stop_event` was set during the delay
+    if stop_event is not None:
+        return stop_event.wait(delay)
+    if delay > 0:
+        time.sleep(delay)
+    return False
+
+
+JSON_UNITS = {"Temperature": " C", "Altitude": " m", "Humidity": " %"}  # Suffixes of the JSON sensor values
+
+
+class _SimulatedSensors:
+    # Sensor values of the example peripheral, the JSON and packed services only encode them differently. Polled like
+    # the real services, `rate_field` is the SimulatorConfig field giving their reads per second.
+    rate_field = "json_rate"
+
+    def __init__(self, config: SimulatorConfig, rng: random.Random, connection: "SimulatedConnection"):
+        # The _bleio service of the parent classes is not created
+        self._config = config
+        self._rng = rng
+        self._connection = connection
+        rate = getattr(config, self.rate_field)
+        self.read_interval = 1.0 / rate if rate > 0 else type(self).read_interval
+        self._start = time.monotonic()
+        self._step = 0
+
+    def _value(self, center: float, amplitude: float, period: float) -> float:
+        return center + amplitude * math.sin(2 * math.pi * self._step / period) + self._rng.gauss(0, amplitude / 10)
+
+    def _read_sensors(self) -> Optional[Dict[str, float]]:
+        # The values by field name of `ExJSONService.decode`, None when the read is dropped
+        self._connection.check()
+        _wait(self._config.latency)
+        self._step += 1
+        if self._rng.random() < self._config.drop_rate:
+            return None
+        value = self._value
+        return {
+            "Proximity": max(value(20, 20, 50), 0),
+            "Temperature": value(22, 2, 120),
+            "Barometric_pressure": value(1013, 3, 300),
+            "Altitude": value(100, 5, 300),
+            **{f"Color.{color}": max(value(center, 30, 80), 0)
+               for color, center in (("Red", 80), ("Green", 120), ("Blue", 60), ("Clear", 200))},
+            "Sound_level": max(value(60, 25, 40), 0),
+            **{f"Magnetic.{axis}": value(0, 40, 90 + 10 * i) for i, axis in enumerate("xyz")},
+            **{f"Acceleration.{axis}": value(0, 9.8, 30 + 5 * i) for i, axis in enumerate("xyz")},
+            **{f"Gyro.{axis}": value(0, 1, 20 + 3 * i) for i, axis in enumerate("xyz")},
+            "Humidity": min(max(value(55, 20, 200), 0), 100),
+        }
+
+    def write(self):
+        pass
+
+
+class SimulatedJSONService(_SimulatedSensors, ExJSONService):
+    # `read` returns the JSON text the example peripheral sends
+    def read(self):
+        values = self._read_sensors()
+        if values is None:
+            return None
+        sensors = {}
+        for field, value in values.items():
+            group, _, name = field.rpartition(".")
+            (sensors.setdefault(group, {}) if group else sensors)[name] = f"{value:.2f}{JSON_UNITS.get(field, '')}"
+        return json.dumps({"Sensors": sensors})
+
+
+class SimulatedPackedService(_SimulatedSensors, ExPackedService):
+    # `read` returns the same values as a SENSOR_SCHEMA record, numbered and timestamped since the connection
+    rate_field = "packed_rate"
+
+    def read(self):
+        values = self._read_sensors()
+        if values is None:
+            return None
+        return SENSOR_SCHEMA.pack(values, sequence=self._step, timestamp=int((time.monotonic() - self._start) * 1000))
+
+
+class SimulatedUARTService(UARTService):
+    # Pushes lines of numbers cut into `uart_payload` byte notifications, like a peripheral printing a sensor value
+    def __init__(self, config: SimulatorConfig, rng: random.Random, connection: "SimulatedConnection"):
+        # The _bleio service of the parent classes is not created
+        self._config = config
+        self._rng = rng
+        self._connection = connection
+        self._stream = bytearray()
+        self._pending = bytearray()  # Received while not subscribed, returned by `read_pending`
+        self._step = 0
+        self._notify_callback = None
+        self._notify_stop = None
+        self._lock = threading.Lock()
+        self._decode_splitter = LineSplitter()
+
+    def _next_payload(self) -> bytes:
+        while len(self._stream) < self._config.uart_payload:
+            self._step += 1
+            value = 50 * math.sin(2 * math.pi * self._step / 200) + self._rng.gauss(0, 2)
+            self._stream += f"{value:.3f}\n".encode()
+        payload = bytes(self._stream[:self._config.uart_payload])
+        del self._stream[:self._config.uart_payload]
+        return payload
+
+    def _notify(self, callback, stop_event: threading.Event):
+        interval = 1.0 / self._config.uart_rate if self._config.uart_rate > 0 else 1.0
+        due = time.monotonic()
+        while self._connection.connected:
+            due += interval
+            if _wait(max(due - time.monotonic(), self._config.latency), stop_event):
+                return
+            payload = self._next_payload()
+            if self._rng.random() < self._config.drop_rate:
+                continue
+            if callback is not None:
+                callback(payload)
+            else:
+                with self._lock:
+                    self._pending += payload
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._pending)
+
+    def read(self, nbytes=None):
+        with self._lock:
+            nbytes = len(self._pending) if nbytes is None else nbytes
+            data = bytes(self._pending[:nbytes])
+            del self._pending[:nbytes]
+        return data
+
+    def read_pending(self):
+        self._connection.check()
+        return self.read() or None
+
+    def _start(self, callback):
+        self._stop_notifications()
+        self._notify_callback = callback
+        self._notify_stop = threading.Event()
+        threading.Thread(target=self._notify, args=(callback, self._notify_stop), daemon=True).start()
+
+    def _stop_notifications(self):
+        if self._notify_stop is not None:
+            self._notify_stop.set()
+        self._notify_stop = None
+        self._notify_callback = None
+
+    def subscribe(self, callback) -> bool:
+        self._start(callback)
+        return True
+
+    def unsubscribe(self):
+        self._stop_notifications()
+
+
+SIMULATED_SERVICES = {
+    ExJSONService: SimulatedJSONService,
+    UARTService: SimulatedUARTService,
+    ExPackedService: SimulatedPackedService,
+}
+
+
+class SimulatedConnection:
+    def __init__(self, advertiser: _Advertiser, config: SimulatorConfig, rng: random.Random):
+        self._advertiser = advertiser
+        self._config = config
+        self._rng = rng
+        self._services = {}
+        self.connected = True
+
+    def check(self):
+        if not self.connected:
+            raise ConnectionError(f"{self._advertiser.address} is disconnected")
+
+    @staticmethod
+    def _simulated_type(key):
+        # Like BLEConnection, `key` is a service class or a UUID
+        uuid = normalize_uuid(getattr(key, "uuid", key))
+        return next((simulated for simulated in SIMULATED_SERVICES.values()
+                     if normalize_uuid(simulated.uuid) == uuid), None)
+
+    def __contains__(self, key) -> bool:
+        return self._simulated_type(key) is not None
+
+    def __getitem__(self, key):
+        self.check()
+        simulated = self._simulated_type(key)
+        if simulated is None:
+            raise KeyError(key)
+        if simulated not in self._services:
+            _wait(self._config.latency)  # Discovery
+            self._services[simulated] = simulated(self._config, self._rng, self)
+        return self._services[simulated]
+
+    def disconnect(self):
+        self.connected = False
+        for service in self._services.values():
+            service.unsubscribe()
+
+
+class SimulatedRadio(RadioBackend):
+    # In-process radio: `config.advertisers` devices advertise at `config.advertising_rate` and the first
+    # `config.peripherals` ones accept connections exposing the SIMULATED_SERVICES. Runs are reproducible for a
+    # given `config.seed`, apart from thread timing.
+    def __init__(self, config: SimulatorConfig = SimulatorConfig()):
+        self._config = config
+        self._rng = random.Random(config.seed)
+        self._advertisers: Dict[str, _Advertiser] = {}
+        for index in range(config.advertisers):
+            advertiser = _Advertiser(index, config, self._rng)
+            self._advertisers[advertiser.address] = advertiser
+        self._connections: List[SimulatedConnection] = []
+        self._scanning = False
+
+    @property
+    def config(self) -> SimulatorConfig:
+        return self._config
+
+    def start_scan(self, *advertisement_types, timeout=None, interval=0.1, window=0.1, **kwargs):
+        self._scanning = True
+        start = time.monotonic()
+        period = 1.0 / self._config.advertising_rate if self._config.advertising_rate > 0 else math.inf
+        # Next advertisement of each advertiser, spread over the first period
+        schedule = [(start + self._rng.random() * period, address) for address in self._advertisers]
+        heapq.heapify(schedule)
+        while self._scanning and schedule:
+            now = time.monotonic()
+            if timeout is not None and now - start >= timeout:
+                break
+            due, address = schedule[0]
+            if due > now:
+                time.sleep(min(due - now, SCAN_POLL_INTERVAL))
+                continue
+            heapq.heapreplace(schedule, (due + period * (0.5 + self._rng.random()), address))
+            yield self._advertisers[address].advertise(self._config, self._rng)
+
+    def stop_scan(self):
+        self._scanning = False
+
+    def connect(self, advertisement, timeout=4.0):
+        _wait(min(self._config.latency, timeout))
+        advertiser = self._advertisers.get(advertisement.address.string)
+        if advertiser is None or not advertiser.connectable:
+            raise ConnectionError(f"{advertisement.address.string} is not connectable")
+        if self._rng.random() < self._config.connect_failure_rate:
+            raise ConnectionError(f"Simulated connection failure to {advertiser.address}")
+        connection = SimulatedConnection(advertiser, self._config, self._rng)
+        self._connections = [other for other in self._connections if other.connected] + [connection]
+        return connection
+
+    @property
+    def connections(self):
+        return tuple(connection for connection in self._connections if connection.connected)
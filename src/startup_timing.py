@@ -0,0 +1,42 @@
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Set PYBLETOOLKIT_STARTUP_TIMING=1 to print how long the startup steps and the imports of the service plugins take.
+# The times are counted from the import of this module, which src.main imports first. The plugins are imported when
+# one of their services is found on a connection, their imports are printed then.
+STARTUP_TIMING_ENV_VAR = "PYBLETOOLKIT_STARTUP_TIMING"
+
+_origin = time.perf_counter()
+_enabled = os.environ.get(STARTUP_TIMING_ENV_VAR, "") not in ("", "0")
+
+
+def _elapsed_ms(since: float = _origin) -> float:
+    return (time.perf_counter() - since) * 1000
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _enabled:
+            print(f"Startup timing: {label} took {_elapsed_ms(start):.1f} ms "
+                  f"(done at {_elapsed_ms():.1f} ms)", file=sys.stderr)
+
+
+def timed_import(module: str):
+    # A module that is already imported costs nothing and is not printed
+    if module in sys.modules:
+        return sys.modules[module]
+    with timed(f"import {module}"):
+        return importlib.import_module(module)
+
+
+def mark(label: str):
+    # A point of the startup, e.g. the first frame
+    if _enabled:
+        print(f"Startup timing: {label} at {_elapsed_ms():.1f} ms", file=sys.stderr)
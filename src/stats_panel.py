@@ -0,0 +1,118 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import customtkinter as ctk
+
+from src.metrics import REGISTRY, HistogramValue, MetricsRegistry, metrics_url
+from src.profiling import PROFILE_DIR, PROFILE_MODES, PROFILER
+from src.utils import STD_PADDING
+
+STATS_REFRESH_INTERVAL = 1000  # ms between two updates of the stats panel
+STATS_WINDOW_SIZE = "900x600"
+METRIC_PREFIX = "pybletoolkit_"
+
+
+def _label_text(labels: Dict[str, str]) -> str:
+    return " ".join(value for value in labels.values() if value) or "-"
+
+
+def _scaled(metric_name: str, value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if metric_name.endswith("_seconds"):
+        return f"{value * 1000:.2f} ms"
+    return f"{value:.0f}"
+
+
+def format_stats(registry: MetricsRegistry, previous: Dict[Tuple[str, str], float], elapsed: float) -> List[str]:
+    # One line per value of each metric, the counters with their rate since `previous` (updated in place)
+    lines = []
+    for metric in registry.metrics():
+        children = metric.children()
+        if not children:
+            continue
+        lines.append(metric.name[len(METRIC_PREFIX):] if metric.name.startswith(METRIC_PREFIX) else metric.name)
+        for labels, child in sorted(children, key=lambda item: _label_text(item[0])):
+            key = (metric.name, _label_text(labels))
+            if isinstance(child, HistogramValue):
+                counts, total = child.snapshot()
+                count = sum(counts)
+                mean = total / count if count else None
+                lines.append(f"  {key[1]:<40} count {count:>10}   mean {_scaled(metric.name, mean):>10}   "
+                             f"p95 <= {_scaled(metric.name, child.quantile(0.95)):>10}")
+            elif metric.type_name == "counter":
+                value = child.value
+                rate = (value - previous.get(key, value)) / elapsed if elapsed > 0 else 0.0
+                previous[key] = value
+                lines.append(f"  {key[1]:<40} total {value:>10.0f}   {rate:>10.1f} /s")
+            else:
+                lines.append(f"  {key[1]:<40} {child.value:>16.0f}")
+    return lines
+
+
+class ProfilingBar(ctk.CTkFrame):
+    # Switches the profiling modes on and off at runtime and dumps their results
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        ctk.CTkLabel(master=self, text="Profiling:").grid(row=0, column=0, padx=STD_PADDING, pady=STD_PADDING)
+        self._mode_boxes = {}
+        for column, mode in enumerate(PROFILE_MODES, start=1):
+            box = ctk.CTkCheckBox(master=self, text=mode.capitalize(), command=lambda mode=mode: self._mode_cmd(mode))
+            if mode in PROFILER.modes:
+                box.select()
+            box.grid(row=0, column=column, padx=STD_PADDING, pady=STD_PADDING)
+            self._mode_boxes[mode] = box
+        dump_button = ctk.CTkButton(master=self, text="Dump", width=70, command=self._dump_cmd)
+        dump_button.grid(row=0, column=len(PROFILE_MODES) + 1, padx=STD_PADDING, pady=STD_PADDING)
+        self._status_label = ctk.CTkLabel(master=self, text="", anchor="w")
+        self._status_label.grid(row=0, column=len(PROFILE_MODES) + 2, padx=STD_PADDING, pady=STD_PADDING, sticky="w")
+
+    def _mode_cmd(self, mode: str):
+        PROFILER.set_mode(mode, self._mode_boxes[mode].get() == 1)
+
+    def _dump_cmd(self):
+        try:
+            paths = PROFILER.dump()
+        except OSError as e:
+            print(f"Profiling: Cannot write the results: {e}")
+            self._status_label.configure(text="Cannot write the results")
+            return
+        self._status_label.configure(text=f"{len(paths)} file(s) written to {PROFILE_DIR}/" if paths else
+                                     "Nothing to dump, switch a mode on first")
+
+
+class StatsWindow(ctk.CTkToplevel):
+    # Metrics of the pipeline refreshed every STATS_REFRESH_INTERVAL, the same ones as the Prometheus endpoint
+    def __init__(self, master, server=None, registry: MetricsRegistry = REGISTRY, **kwargs):
+        super().__init__(master, **kwargs)
+        self.title("Statistics")
+        self.geometry(STATS_WINDOW_SIZE)
+        self._registry = registry
+        self._previous: Dict[Tuple[str, str], float] = {}
+        self._last_refresh = time.monotonic()
+        self._refresh_id = None
+
+        endpoint = f"Prometheus endpoint: {metrics_url(server)}" if server is not None else \
+            "Prometheus endpoint disabled, set PYBLETOOLKIT_METRICS_PORT to serve the metrics"
+        ctk.CTkLabel(master=self, text=endpoint, anchor="w").pack(padx=STD_PADDING, pady=STD_PADDING, fill=ctk.X)
+        ProfilingBar(master=self).pack(padx=STD_PADDING, fill=ctk.X)
+        self._text = ctk.CTkTextbox(master=self, wrap="none", font=ctk.CTkFont(family="Courier"))
+        self._text.pack(padx=STD_PADDING, pady=STD_PADDING, fill=ctk.BOTH, expand=True)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self._refresh()
+
+    def _refresh(self):
+        now = time.monotonic()
+        lines = format_stats(self._registry, self._previous, now - self._last_refresh)
+        self._last_refresh = now
+        self._text.configure(state="normal")
+        self._text.delete("1.0", ctk.END)
+        self._text.insert("1.0", "\n".join(lines) or "No data yet")
+        self._text.configure(state="disabled")
+        self._refresh_id = self.after(STATS_REFRESH_INTERVAL, self._refresh)
+
+    def close(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        self.destroy()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from src.abstract_service_tab import AbstractServiceTab, DROP_NEWEST, DROP_OLDEST, MERGE
+from src.metrics import TAB_UPDATE_SECONDS, UI_DROPPED_SAMPLES, UI_QUEUE_DEPTH
+from src.utils import DEFAULT_UI_FPS, DEFAULT_UI_QUEUE_SIZE
+
+
+class UIDispatcher:
+    # Queues the samples posted by the reading threads for each tab and hands them over to the tabs once per frame,
+    # so a fast device cannot flood the Tk event queue. A tab receives samples from its `register` to its `discard`,
+    # a read still in flight when its tab is discarded is dropped.
+    def __init__(self, master, fps: float = DEFAULT_UI_FPS, max_queue: int = DEFAULT_UI_QUEUE_SIZE,
+                 policy: str = DROP_OLDEST):
+        self._master = master
+        self._max_queue = max(1, max_queue)
+        self._policy = policy
+        self._queues: Dict[AbstractServiceTab, Deque] = {}  # One per registered tab
+        self._dropped: Dict[AbstractServiceTab, int] = {}
+        self._labels: Dict[AbstractServiceTab, Dict[str, str]] = {}  # Labels of the metrics of each tab
+        self._metrics: Dict[AbstractServiceTab, Tuple] = {}  # Queue depth, dropped samples and update duration
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_flush = 0.0
+        self._frame_interval = 1.0
+        self.set_fps(fps)
+
+    def set_fps(self, fps: float):
+        self._frame_interval = 1.0 / max(float(fps), 1.0)
+
+    def get_fps(self) -> float:
+        return 1.0 / self._frame_interval
+
+    def register(self, tab: AbstractServiceTab, device: Optional[str] = None):
+        # The metrics of `tab` are labelled with the address of its device, to tell the tabs of the same type apart
+        with self._lock:
+            self._queues.setdefault(tab, deque())
+            self._labels[tab] = {"tab": type(tab).__name__, "device": device}
+            self._metrics.pop(tab, None)
+
+    def _tab_metrics(self, tab: AbstractServiceTab) -> Tuple:
+        metrics = self._metrics.get(tab)
+        if metrics is None:
+            labels = self._labels.get(tab) or {"tab": type(tab).__name__}
+            metrics = self._metrics[tab] = (UI_QUEUE_DEPTH.labels(**labels), UI_DROPPED_SAMPLES.labels(**labels),
+                                            TAB_UPDATE_SECONDS.labels(**labels))
+        return metrics
+
+    def post(self, tab: AbstractServiceTab, sample):
+        # Thread-safe, may be called from any thread. Ignored when `tab` is not registered.
+        with self._lock:
+            queue = self._queues.get(tab)
+            if queue is None:
+                return
+            queue_depth, dropped, _ = self._tab_metrics(tab)
+            if len(queue) >= self._max_queue:
+                policy = tab.backpressure_policy or self._policy
+                if policy == MERGE:
+                    queue.append(sample)
+                    merged = tab.merge_samples(list(queue))  # Nothing is lost, the samples are combined
+                    queue.clear()
+                    queue.extend(merged)
+                elif policy == DROP_NEWEST:
+                    self._dropped[tab] = self._dropped.get(tab, 0) + 1
+                    dropped.inc()
+                else:
+                    queue.popleft()
+                    queue.append(sample)
+                    self._dropped[tab] = self._dropped.get(tab, 0) + 1
+                    dropped.inc()
+            else:
+                queue.append(sample)
+            queue_depth.set(len(queue))
+
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                delay = self._last_flush + self._frame_interval - time.monotonic()
+                self._master.after(max(0, int(delay * 1000)), self._flush)
+
+    def discard(self, tab: AbstractServiceTab):
+        with self._lock:
+            self._queues.pop(tab, None)
+            self._dropped.pop(tab, None)
+            self._metrics.pop(tab, None)
+            labels = self._labels.pop(tab, None) or {"tab": type(tab).__name__}
+        UI_QUEUE_DEPTH.remove(**labels)
+
+    def queue_depth(self, tab: Optional[AbstractServiceTab] = None) -> int:
+        with self._lock:
+            if tab is not None:
+                return len(self._queues.get(tab, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def dropped_samples(self, tab: Optional[AbstractServiceTab] = None) -> int:
+        with self._lock:
+            if tab is not None:
+                return self._dropped.get(tab, 0)
+            return sum(self._dropped.values())
+
+    def _flush(self):
+        with self._lock:
+            self._flush_scheduled = False
+            self._last_flush = time.monotonic()
+            batches = [(tab, list(queue), self._tab_metrics(tab)) for tab, queue in self._queues.items() if queue]
+            for queue in self._queues.values():
+                queue.clear()
+            for _, _, (queue_depth, _, _) in batches:
+                queue_depth.set(0)
+
+        for tab, samples, (_, _, update_seconds) in batches:
+            if not tab.winfo_exists():  # Destroyed before its discard
+                continue
+            try:
+                start = time.perf_counter()
+                tab.update_data_batch(samples)
+                update_seconds.observe(time.perf_counter() - start)
+            except Exception as e:
+                print(f"UIDispatcher: Error during updating {type(tab).__name__}: {e}")
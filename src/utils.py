@@ -11,3 +11,6 @@ BASE_WINDOW_WIDTH = 2560
 BASE_WINDOW_HEIGHT = 1440
 
 DEFAULT_APP_SCALING = 1.4
+
+DEFAULT_UI_FPS = 30  # Rate at which the samples received by the service tabs are flushed to the GUI
+DEFAULT_UI_QUEUE_SIZE = 256  # Samples kept per tab between two frames before the backpressure policy applies